@@ -0,0 +1,228 @@
+"""
+
+Benchmarks for the vocabulary build in build.py at a synthetic scale.
+
+The real vocabulary only has a few dozen types, which is too small to judge
+changes to the build. This script generates a synthetic vocabulary (many
+types, deep or wide hierarchies, many properties), a synthetic previous
+release of it, and a synthetic specification directory, and then times the
+expensive steps of the build on them:
+
+- constructing the vocabulary `Tree`
+- `propagate_version_changes` against the previous release
+- rendering the index page and the type pages, with each of the renderers
+- `copy` of the specification directory, to an empty and to an up-to-date
+  destination
+
+Results are printed as a table with throughput numbers and can be written to a
+JSON file, tagged with the current git commit, to compare across commits:
+
+```bash
+$ python benchmark.py --types 2000 --shape deep --json bench-$(git rev-parse --short HEAD).json
+```
+
+"""
+import argparse
+import contextlib
+import copy as copylib
+import io
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+from os.path import join as pjoin
+from typing import Dict, List
+
+import build
+
+SHAPES = ('deep', 'wide', 'mixed')
+
+
+def synthetic_vocabulary(num_types: int, shape: str = 'mixed', num_properties: int = 5,
+                         seed: int = 0) -> List[Dict]:
+    """Return a list of type definitions like the ones read from the vocabulary
+    YAML file. With the `deep` shape most types extend the previously added type,
+    with the `wide` shape most types extend the root or one of its children."""
+    rng = random.Random(seed)
+    types = [{'name': 'Thing', 'parent': None, 'description': 'Abstract top type.',
+              'properties': {'id': {'type': 'ID', 'description': 'A unique identifier.', 'required': True}}}]
+    for i in range(1, num_types):
+        if shape == 'deep':
+            # keep chains deep, but well below the recursion limit of the recursive page builders
+            parent = types[-1] if i % 100 else types[0]
+        elif shape == 'wide':
+            parent = types[rng.randrange(min(len(types), 10))]
+        else:
+            parent = types[rng.randrange(max(len(types) - 20, 0), len(types))]
+        clams_type = {'name': f'Type{i}', 'parent': parent['name'],
+                      'description': f'Synthetic type number {i}. ' * rng.randint(1, 5)}
+        for proptype, count in (('properties', num_properties), ('metadata', num_properties // 2)):
+            props = {}
+            for j in range(rng.randint(0, count)):
+                # now and then reuse a name from the parent to get shadowed properties
+                name = rng.choice(list(parent.get(proptype, {})) or [f'{proptype}{i}_{j}']) \
+                    if rng.random() < 0.1 else f'{proptype}{i}_{j}'
+                props[name] = {'type': rng.choice(['String', 'Integer', 'ID', 'List of IDs']),
+                               'description': f'Synthetic {proptype} {j} of type {i}.',
+                               'required': rng.random() < 0.2}
+            if props:
+                clams_type[proptype] = props
+        types.append(clams_type)
+    return types
+
+
+def synthetic_previous_release(clams_types: List[Dict], change_rate: float = 0.05,
+                               new_rate: float = 0.02, seed: int = 0) -> List[Dict]:
+    """Return what the vocabulary could have looked like in the previous release:
+    some types are missing (they are new now), and some have another description
+    or other properties."""
+    rng = random.Random(seed)
+    old_types = []
+    for clams_type in clams_types:
+        if clams_type['parent'] is not None and rng.random() < new_rate:
+            continue
+        old_type = copylib.deepcopy(build.plain_type(clams_type))
+        if rng.random() < change_rate:
+            if rng.random() < 0.5:
+                old_type['description'] += ' Old description.'
+            else:
+                old_type.setdefault('properties', {})['removedProperty'] = {'type': 'String'}
+        old_types.append(old_type)
+    return old_types
+
+
+def synthetic_release_history(clams_types: List[Dict], num_releases: int = 20, seed: int = 0) -> Dict[str, List]:
+    """Return a dict of at_type name to the list of releases that included each of
+    its versions, like the ones collected from the attype versions index."""
+    rng = random.Random(seed)
+    releases = [f'1.{minor}.0' for minor in range(num_releases)]
+    history = {}
+    for clams_type in clams_types:
+        versions = {}
+        version = 1
+        for release in releases:
+            if rng.random() < 0.1:
+                version += 1
+            versions.setdefault(build.format_attype_version(version), []).append(release)
+        clams_type['version'] = build.format_attype_version(version)
+        history[clams_type['name']] = versions
+    return history
+
+
+def synthetic_spec_dir(dirname: str, num_files: int = 50, file_size: int = 1 << 16, seed: int = 0) -> Dict:
+    """Write a specification-like directory with templated JSON and markdown
+    files and some binary files, and return the templating dictionary."""
+    rng = random.Random(seed)
+    templating = {'VERSION': '9.9.9', 'TimeFrame_VER': 'v1', 'Token_VER': 'v2'}
+    for i in range(num_files):
+        subdir = pjoin(dirname, f'sample{i % 10}')
+        os.makedirs(subdir, exist_ok=True)
+        if i % 5 == 4:
+            with open(pjoin(subdir, f'image{i}.jpg'), 'wb') as fh:
+                fh.write(rng.randbytes(file_size))
+            continue
+        line = '{"@type": "http://mmif.clams.ai/vocabulary/TimeFrame/${TimeFrame_VER}", "cost": "$$5"},\n'
+        with open(pjoin(subdir, f'raw{i}.json' if i % 2 else f'index{i}.md'), 'w') as fh:
+            fh.write('MMIF version $VERSION\n')
+            fh.write(line * (file_size // len(line)))
+    return templating
+
+
+def timed(fn, *args, repeat: int = 1):
+    """Run fn repeat times with stdout suppressed, and return the last result and
+    the best wall time."""
+    best = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = fn(*args)
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def render_index_page(clams_types: List[Dict]) -> str:
+    return build.make_index_page(clams_types, os.devnull, '9.9.9').render()
+
+
+def render_type_pages(tree: build.Tree, history: Dict[str, Dict], num_pages: int) -> int:
+    for clams_type in tree.types[:num_pages]:
+        chain = [{k: n.get(k) for k in ('name', 'version', 'metadata', 'properties')}
+                 for n in tree.ancestors(clams_type['name'])]
+        included_in = history[clams_type['name']][clams_type['version']] + ['9.9.9']
+        build.make_type_page(build.plain_type(clams_type), chain, os.devnull, included_in).render()
+    return num_pages
+
+
+def run(args) -> List[Dict]:
+    results = []
+
+    def report(name: str, seconds: float, items: int, unit: str) -> None:
+        results.append({'benchmark': name, 'seconds': seconds, 'items': items,
+                        'throughput': items / seconds if seconds else float('inf'), 'unit': unit})
+
+    clams_types = synthetic_vocabulary(args.types, args.shape, args.properties, args.seed)
+    old_types = {t['name']: t for t in synthetic_previous_release(clams_types, seed=args.seed)}
+
+    # Tree adds links to the type dicts, so every run gets a fresh copy
+    fresh_types = [copylib.deepcopy(clams_types) for _ in range(args.repeat)]
+    tree, seconds = timed(lambda: build.Tree(fresh_types.pop()), repeat=args.repeat)
+    report('Tree construction', seconds, len(clams_types), 'types')
+    _, seconds = timed(build.propagate_version_changes, tree.root, old_types, repeat=args.repeat)
+    report('propagate_version_changes', seconds, len(clams_types), 'types')
+
+    history = synthetic_release_history(tree.types, args.releases, args.seed)
+    plain_types = [build.plain_type(t) for t in tree.types]
+    num_pages = min(args.pages, len(tree.types))
+    for renderer in build.RENDERERS:
+        build.set_renderer(renderer)
+        html, seconds = timed(render_index_page, plain_types, repeat=args.repeat)
+        report(f'IndexPage ({renderer})', seconds, len(html), 'bytes')
+        _, seconds = timed(render_type_pages, tree, history, num_pages, repeat=args.repeat)
+        report(f'TypePage ({renderer})', seconds, num_pages, 'pages')
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        src, dst = pjoin(tmpdir, 'src'), pjoin(tmpdir, 'dst')
+        templating = synthetic_spec_dir(src, args.files, args.file_size, args.seed)
+        num_bytes = sum(os.path.getsize(pjoin(r, f)) for r, _, fs in os.walk(src) for f in fs)
+        _, seconds = timed(build.copy, src, dst, {}, {}, templating)
+        report('copy (new destination)', seconds, num_bytes, 'bytes')
+        _, seconds = timed(build.copy, src, dst, {}, {}, templating, repeat=args.repeat)
+        report('copy (up-to-date destination)', seconds, num_bytes, 'bytes')
+    return results
+
+
+def git_commit() -> str:
+    proc = subprocess.run('git rev-parse HEAD'.split(), cwd=os.path.dirname(os.path.abspath(__file__)),
+                          capture_output=True)
+    return proc.stdout.decode('ascii').strip()
+
+
+def print_results(results: List[Dict]) -> None:
+    print(f"{'benchmark':32} {'seconds':>10} {'throughput':>16}")
+    for r in results:
+        print(f"{r['benchmark']:32} {r['seconds']:10.4f} {r['throughput']:12.1f} {r['unit']}/s")
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--types', type=int, default=1000, help='number of types in the synthetic vocabulary')
+    parser.add_argument('--shape', choices=SHAPES, default='mixed', help='shape of the type hierarchy')
+    parser.add_argument('--properties', type=int, default=5, help='maximum number of properties per type')
+    parser.add_argument('--releases', type=int, default=20, help='number of releases in the synthetic history')
+    parser.add_argument('--pages', type=int, default=200, help='number of type pages to render')
+    parser.add_argument('--files', type=int, default=50, help='number of files in the synthetic specification')
+    parser.add_argument('--file-size', type=int, default=1 << 16, help='approximate size of each file in bytes')
+    parser.add_argument('--repeat', type=int, default=3, help='number of runs, the best run is reported')
+    parser.add_argument('--seed', type=int, default=0, help='seed for generating the synthetic data')
+    parser.add_argument('--json', default=None, help='also write the results to this JSON file')
+    args = parser.parse_args()
+    results = run(args)
+    print_results(results)
+    if args.json is not None:
+        with open(args.json, 'w') as fh:
+            json.dump({'commit': git_commit(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       'parameters': vars(args), 'results': results}, fh, indent=2)
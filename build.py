@@ -12,17 +12,22 @@ created or updated.
 """
 import argparse
 import collections
+import contextlib
+import filecmp
+import hashlib
 import json
 import os
 import re
 import shutil
 import subprocess
 import time
+import tracemalloc
 import urllib.error
 import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from os.path import join as pjoin
 from string import Template
-from typing import Union, List, Dict, Optional, Set
+from typing import Union, List, Dict, Iterator, Optional, Set
 from urllib import request
 from packaging.version import parse as ver_parse
 
@@ -35,7 +40,24 @@ INCLUDE_CONTEXT = False
 BASEURL = 'http://mmif.clams.ai'
 # this file will store a dict of at_type: version, where version is formatted as `v1`
 ATTYPE_VERSIONS_JSONFILENAME = 'attypeversions.json'
+# incremental builds keep a dict of output_path: input_digest for each output directory in this directory
+# in the project root, outside of the published docs, to skip outputs whose inputs did not change
+BUILD_MANIFEST_DIRNAME = '.buildmanifest'
+# this file, stored with the individually versioned type pages, consolidates the attype versions files
+# of all releases into a dict of at_type: version: releases
+ATTYPE_VERSIONS_INDEX_JSONFILENAME = 'attypeversions-index.json'
 VOCAB_TITLE = 'CLAMS Vocabulary'
+GITHUB_TAGS_URL = 'https://api.github.com/repos/clamsproject/mmif/git/refs/tags'
+# release tags from GitHub are cached in this file in the project root
+TAGS_CACHE_FILENAME = '.tagscache.json'
+# backend used to build and serialize HTML pages, either `soup` (BeautifulSoup) or `string` (see Element)
+RENDERERS = ('soup', 'string')
+RENDERER = 'soup'
+# number of threads and size of the chunks (in characters) used when copying specification and schema files
+COPY_THREADS = 8
+COPY_CHUNK_SIZE = 1 << 16
+# html elements that can't have contents, these are serialized as <tag/>
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
 
 
 def read_yaml(fp: Union[str, bytes, TextIO]) -> List[Dict]:
@@ -47,8 +69,102 @@ def read_yaml(fp: Union[str, bytes, TextIO]) -> List[Dict]:
     return docs
 
 
-def get_soup() -> BeautifulSoup:
+class Element(object):
+    """Lightweight stand-in for a soup Tag, used by the `string` renderer. It
+    supports the small part of the Tag API used by the pages in this script and
+    serializes to exactly the same text as BeautifulSoup.prettify() with the
+    HTMLFormatter used in Page.write(): attributes sorted by name, no entity
+    substitution, stripped strings on their own lines, and void elements closed
+    with a slash."""
+
+    __slots__ = ('name', 'attrs', 'contents')
+
+    def __init__(self, name: str, attrs: Optional[Dict] = None) -> None:
+        self.name = name
+        self.attrs = {} if attrs is None else attrs
+        self.contents = []
+
+    def append(self, child: Union['Element', str]) -> None:
+        self.contents.append(child if isinstance(child, Element) else str(child))
+
+    def extend(self, children: List[Union['Element', str]]) -> None:
+        for child in children:
+            self.append(child)
+
+    def find(self, id: str) -> Optional['Element']:
+        """Return the first element in document order with the given id."""
+        if self.attrs.get('id') == id:
+            return self
+        for child in self.contents:
+            if isinstance(child, Element):
+                found = child.find(id)
+                if found is not None:
+                    return found
+        return None
+
+    def _open_tag(self) -> str:
+        attrs = []
+        for key, val in sorted(self.attrs.items()):
+            if val is None:
+                attrs.append(key)
+                continue
+            val = ' '.join(val) if isinstance(val, (list, tuple)) else str(val)
+            if '"' not in val:
+                attrs.append(f'{key}="{val}"')
+            elif "'" not in val:
+                attrs.append(f"{key}='{val}'")
+            else:
+                attrs.append('%s="%s"' % (key, val.replace('"', '&quot;')))
+        attrs = ' ' + ' '.join(attrs) if attrs else ''
+        if self.name in VOID_ELEMENTS and not self.contents:
+            return f'<{self.name}{attrs}/>'
+        return f'<{self.name}{attrs}>'
+
+    def _serialize(self, pieces: List[str], indent: str, level: int) -> None:
+        space = indent * level
+        pieces.append(f'{space}{self._open_tag()}\n')
+        if self.name in VOID_ELEMENTS and not self.contents:
+            return
+        for child in self.contents:
+            if isinstance(child, Element):
+                child._serialize(pieces, indent, level + 1)
+            else:
+                child = child.strip()
+                if child:
+                    pieces.append(f'{space}{indent}{child}\n')
+        pieces.append(f'{space}</{self.name}>\n')
+
+    def prettify(self, formatter: Optional[HTMLFormatter] = None) -> str:
+        pieces = []
+        self._serialize(pieces, ' ' if formatter is None else formatter.indent, 0)
+        return ''.join(pieces)
+
+
+class Document(Element):
+    """Top-level element of a page built with the `string` renderer, with the
+    head and body shortcuts of a soup."""
+
+    __slots__ = ('head', 'body')
+
+    def __init__(self) -> None:
+        super().__init__('html')
+        self.head = Element('head')
+        self.body = Element('body')
+        self.extend([self.head, self.body])
+
+
+def set_renderer(renderer: str) -> None:
+    """Select the backend used by get_soup() and tag() to build pages."""
+    global RENDERER
+    if renderer not in RENDERERS:
+        raise ValueError(f'unknown renderer "{renderer}", use one of {", ".join(RENDERERS)}')
+    RENDERER = renderer
+
+
+def get_soup() -> Union[BeautifulSoup, Document]:
     """Return a basic top-level soup."""
+    if RENDERER == 'string':
+        return Document()
     return BeautifulSoup("<html>" +
                          "<head></head>" +
                          "<body></body>" +
@@ -57,10 +173,13 @@ def get_soup() -> BeautifulSoup:
 
 
 def tag(tagname: str, attrs: Optional[Dict] = None, text: Optional[str] = None, dtrs: Optional[List[Tag]] = None) -> Tag:
-    """Return a soup Tag element."""
+    """Return a soup Tag element, or an Element with the `string` renderer."""
     attrs = {} if attrs is None else attrs
     dtrs = [] if dtrs is None else dtrs
-    newtag = BeautifulSoup('', features='html.parser').new_tag(tagname, attrs=attrs)
+    if RENDERER == 'string':
+        newtag = Element(tagname, dict(attrs))
+    else:
+        newtag = BeautifulSoup('', features='html.parser').new_tag(tagname, attrs=attrs)
     if text is not None:
         newtag.append(text)
     for dtr in dtrs:
@@ -102,10 +221,203 @@ def SPAN(text: str) -> Tag:
     return tag('span', text=text)
 
 
+def digest(*objs) -> str:
+    """Return a stable hex digest of JSON-serializable objects."""
+    serialized = json.dumps(objs, sort_keys=True, default=str)
+    return hashlib.sha1(serialized.encode('utf8')).hexdigest()
+
+
+def file_digest(fname: str) -> str:
+    """Return a hex digest of the contents of a file."""
+    h = hashlib.sha1()
+    with open(fname, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# any change to this script (page templates, rendering code) invalidates all recorded outputs
+BUILD_SCRIPT_DIGEST = file_digest(os.path.abspath(__file__))
+
+
+def plain_type(clams_type: Dict) -> Dict:
+    """Return a copy of a type definition without the parentNode and childNodes
+    links added by the Tree."""
+    return {k: v for k, v in clams_type.items() if k not in ('parentNode', 'childNodes')}
+
+
+class BuildManifest(object):
+    """Record of the input digests for all outputs written by an incremental
+    build, with output paths relative to the root directory. An output is only
+    written again when its digest changed since the previous build or when the
+    output file went missing."""
+
+    def __init__(self, fname: str, root: str) -> None:
+        self.fname = fname
+        self.root = root
+        self.previous = {}
+        self.current = {}
+        if os.path.exists(fname):
+            with open(fname) as fh:
+                self.previous = json.load(fh)
+
+    def is_fresh(self, output: str, input_digest: str) -> bool:
+        """Register the input digest for an output and return True if that output
+        can be skipped in this build."""
+        output = os.path.relpath(output, self.root)
+        self.current[output] = input_digest
+        return self.previous.get(output) == input_digest and os.path.exists(pjoin(self.root, output))
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.fname), exist_ok=True)
+        with open(self.fname, 'w') as fh:
+            json.dump(self.current, fh, indent=2, sort_keys=True)
+
+
+class BuildProfile(object):
+    """Records wall time, CPU time and peak memory of the stages of a build.
+    Stages can be nested, the peak memory of a stage includes that of the
+    stages within it. Memory is measured with tracemalloc, so it only covers
+    allocations by Python in this process. When not enabled, stages are not
+    measured at all."""
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.stages = []
+        # stack of [entry, peak memory of finished nested stages, wall start, cpu start]
+        self._running = []
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def start(self, name: str) -> None:
+        """Start measuring a stage, within the currently running stage if any."""
+        if not self.enabled:
+            return
+        # the peak so far belongs to the enclosing stage, keep it before resetting
+        if self._running:
+            self._running[-1][1] = max(self._running[-1][1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        entry = {'stage': name, 'depth': len(self._running)}
+        self.stages.append(entry)
+        self._running.append([entry, 0, time.perf_counter(), time.process_time()])
+
+    def stop(self) -> None:
+        """Stop measuring the most recently started stage."""
+        if not self.enabled:
+            return
+        entry, peak, wall, cpu = self._running.pop()
+        entry['wall'] = time.perf_counter() - wall
+        entry['cpu'] = time.process_time() - cpu
+        entry['peak_memory'] = max(peak, tracemalloc.get_traced_memory()[1])
+        if self._running:
+            self._running[-1][1] = max(self._running[-1][1], entry['peak_memory'])
+        tracemalloc.reset_peak()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def save(self, fname: str, build_time: time.struct_time) -> None:
+        with open(fname, 'w') as fh:
+            json.dump({'time': time.strftime("%Y-%m-%dT%H:%M:%S", build_time), 'stages': self.stages}, fh, indent=2)
+
+    def print_summary(self) -> None:
+        print(f"\n{'stage':50} {'wall (s)':>10} {'cpu (s)':>10} {'peak (KiB)':>12}")
+        for entry in self.stages:
+            name = '  ' * entry['depth'] + entry['stage']
+            print(f"{name:50} {entry['wall']:10.3f} {entry['cpu']:10.3f} {entry['peak_memory'] / 1024:12.1f}")
+
+
+class AttypeVersionsIndex(object):
+    """Index of the versions of the annotation types in all releases, built up
+    from the attype versions files in `docs/x.y.z/vocabulary`. The index is only
+    added to, a release is added when it is built, and it is read in one go
+    instead of reading the attype versions file of every release."""
+
+    def __init__(self, fname: str, load: bool = True) -> None:
+        self.fname = fname
+        # all indexed releases, including those from before types were individually versioned
+        self.releases = []
+        # at_type name -> at_type version -> releases
+        self.attypes = {}
+        if load and os.path.exists(fname):
+            with open(fname) as fh:
+                index = json.load(fh)
+            self.releases = index['releases']
+            self.attypes = index['attypes']
+
+    def add_release(self, release: str, attype_versions: Optional[Dict[str, str]]) -> None:
+        """Add a release with its attype versions, use None for releases without
+        individually versioned types. A release added before is replaced."""
+        if release in self.releases:
+            for versions in self.attypes.values():
+                for releases in versions.values():
+                    if release in releases:
+                        releases.remove(release)
+        else:
+            self.releases = sorted(self.releases + [release])
+        for attypename, attypever in (attype_versions or {}).items():
+            releases = self.attypes.setdefault(attypename, {}).setdefault(attypever, [])
+            releases.append(release)
+            releases.sort()
+
+    def release_versions(self, release: str) -> Dict[str, str]:
+        """Return the at_type versions included in a release."""
+        return {attypename: attypever
+                for attypename, versions in self.attypes.items()
+                for attypever, releases in versions.items() if release in releases}
+
+    def as_dict(self) -> Dict:
+        return {'releases': self.releases, 'attypes': self.attypes}
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.fname), exist_ok=True)
+        with open(self.fname, 'w') as fh:
+            json.dump(self.as_dict(), fh, indent=2, sort_keys=True)
+
+    @classmethod
+    def from_docs(cls, docs_dir: str, fname: str) -> 'AttypeVersionsIndex':
+        """Regenerate the index from the attype versions files of all releases in
+        the docs directory, without reading the existing index file."""
+        index = cls(fname, load=False)
+        for release in sorted(os.listdir(docs_dir)):
+            if re.match(r'\d+\.\d+\.\d+$', release):
+                attype_versions_fname = pjoin(docs_dir, release, 'vocabulary', ATTYPE_VERSIONS_JSONFILENAME)
+                if os.path.exists(attype_versions_fname):
+                    with open(attype_versions_fname) as fh:
+                        index.add_release(release, json.load(fh))
+                else:
+                    index.add_release(release, None)
+        return index
+
+
+def check_attype_versions_index(dirname: str, rebuild: bool = False) -> bool:
+    """Regenerate the attype versions index from the docs directory and compare it
+    to the stored index, optionally replacing the stored one. Return True if they
+    were the same."""
+    fname = pjoin(dirname, 'docs', 'vocabulary', ATTYPE_VERSIONS_INDEX_JSONFILENAME)
+    regenerated = AttypeVersionsIndex.from_docs(pjoin(dirname, 'docs'), fname)
+    stored = AttypeVersionsIndex(fname)
+    same = stored.as_dict() == regenerated.as_dict()
+    if not same:
+        missing = [r for r in regenerated.releases if r not in stored.releases]
+        print(f'{fname} is out of date' + (f', missing releases: {", ".join(missing)}' if missing else ''))
+    if rebuild:
+        regenerated.save()
+        print(f'{fname} regenerated from the docs directory')
+    return same
+
+
 class Tree(object):
     types: List[Dict]
     types_idx: Dict[str, Dict]
     root: Dict
+    ancestors_idx: Dict[str, List[Dict]]
+    effective_idx: Dict[str, Dict]
 
     def __init__(self, clams_types) -> None:
         """Take the generator object and put a dictionary"""
@@ -113,6 +425,7 @@ class Tree(object):
         self.types_idx = { t['name']: t for t in self.types }
         self.root = self.find_root()
         self.build_tree()
+        self.build_index()
 
     def find_root(self) -> Optional[Dict]:
         for t in self.types:
@@ -133,6 +446,43 @@ class Tree(object):
                 t['parentNode'] = parentNode
                 parentNode.setdefault('childNodes', []).append(t)
 
+    def build_index(self) -> None:
+        """Precompute the ancestors and the effective (inherited and merged)
+        metadata and properties of all types. Types are visited top-down, so each
+        type only extends the already computed index entries of its parent."""
+        self.ancestors_idx = {}
+        self.effective_idx = {}
+        agenda = collections.deque(t for t in self.types if t['parentNode'] is None)
+        while agenda:
+            t = agenda.popleft()
+            parent = t['parentNode']
+            if parent is None:
+                self.ancestors_idx[t['name']] = []
+                effective = {'metadata': {}, 'properties': {}}
+            else:
+                self.ancestors_idx[t['name']] = [parent] + self.ancestors_idx[parent['name']]
+                effective = {proptype: dict(props) for proptype, props in self.effective_idx[parent['name']].items()}
+            for proptype in ('metadata', 'properties'):
+                for prop, definition in (t.get(proptype) or {}).items():
+                    inherited = effective[proptype].get(prop)
+                    shadows = [] if inherited is None else [inherited['definedIn']] + inherited['shadows']
+                    effective[proptype][prop] = {'definition': definition, 'definedIn': t['name'], 'shadows': shadows}
+            self.effective_idx[t['name']] = effective
+            agenda.extend(t['childNodes'])
+
+    def ancestors(self, type_name: str) -> List[Dict]:
+        """Return the ancestors of a type, from its parent up to the root."""
+        return self.ancestors_idx[type_name]
+
+    def effective_schema(self, type_name: str) -> Dict[str, Dict]:
+        """Return the effective schema of a type, that is, all metadata and
+        properties that apply to the type, including inherited ones. The result
+        maps `metadata` and `properties` to dictionaries from property names to
+        their `definition`, the type the definition comes from (`definedIn`) and
+        the ancestors whose definitions of the same name are shadowed by it
+        (`shadows`, nearest first)."""
+        return self.effective_idx[type_name]
+
     def print_tree(self, node, level=0) -> None:
         print("%s%s" % ('  ' * level, node['name']))
         for child in node['childNodes']:
@@ -152,7 +502,9 @@ class Page(object):
     fpath: str
     fname: str
     
-    def __init__(self) -> None:
+    def __init__(self, build_time: Optional[time.struct_time] = None) -> None:
+        # all pages of a build get the same timestamp in their footer
+        self.build_time = time.localtime() if build_time is None else build_time
         self.soup = get_soup()
         self._add_stylesheet()
 
@@ -174,25 +526,28 @@ class Page(object):
         self.main_content = self.soup.find(id='mainContent')
 
     def _add_footer(self) -> None:
-        footer = 'Page generated on %s' % time.strftime("%Y-%m-%d at %H:%M:%S")
+        footer = 'Page generated on %s' % time.strftime("%Y-%m-%d at %H:%M:%S", self.build_time)
         self.soup.body.append(DIV({'id': 'footer'}, text=footer))
 
     def _add_space(self) -> None:
         self.main_content.append(tag('br'))
 
+    def render(self) -> str:
+        # https://www.crummy.com/software/BeautifulSoup/bs4/doc/#bs4.HTMLFormatter
+        return self.soup.prettify(formatter=HTMLFormatter(indent=2))
+
     def write(self) -> None:
         if not os.path.exists(self.fpath):
             os.makedirs(self.fpath, exist_ok=True)
         with open(self.fname, 'w') as fh:
-            # https://www.crummy.com/software/BeautifulSoup/bs4/doc/#bs4.HTMLFormatter
-            fh.write(self.soup.prettify(formatter=HTMLFormatter(indent=2)))
+            fh.write(self.render())
 
 
 class IndexPage(Page):
 
-    def __init__(self, tree, outdir, version) -> None:
+    def __init__(self, tree, outdir, version, build_time=None) -> None:
         self.stylesheet = 'css/lappsstyle.css'
-        super().__init__()
+        super().__init__(build_time)
         self.version = version
         self.fpath = outdir
         self.fname = pjoin(outdir, 'index.html')
@@ -271,11 +626,13 @@ class IndexPage(Page):
 
 class TypePage(Page):
 
-    def __init__(self, clams_type, outdir, included_in) -> None:
+    def __init__(self, clams_type, outdir, included_in, chain=None, build_time=None) -> None:
         subdirs = (clams_type['name'], clams_type['version'])
         self.stylesheet = f"{'/'.join(['..'] * len(subdirs))}/css/lappsstyle.css"
-        super().__init__()
+        super().__init__(build_time)
         self.clams_type = clams_type
+        # ancestors from the parent up to the root, usually taken from Tree.ancestors()
+        self.chain = self._chain_to_top() if chain is None else chain
         self.metadata = clams_type.get('metadata', [])
         self.properties = clams_type.get('properties', [])
         self.fpath = pjoin(outdir, *subdirs)
@@ -296,7 +653,7 @@ class TypePage(Page):
 
     def _chain_to_top(self) -> List[Dict]:
         chain = []
-        parent = self.clams_type['parentNode']
+        parent = self.clams_type.get('parentNode')
         while parent is not None:
             chain.append(parent)
             parent = parent['parentNode']
@@ -316,7 +673,7 @@ class TypePage(Page):
             )]))
 
     def _add_head(self, cur_vocab_ver) -> None:
-        chain = reversed(self._chain_to_top())
+        chain = reversed(self.chain)
         dtrs = []
         for n in chain:
             uri_suffix = [n['name'], n['version']]
@@ -374,7 +731,7 @@ class TypePage(Page):
         self._add_properties_from_chain('properties', shadowed_names=self.properties.keys() if self.properties else {})
 
     def _add_properties_from_chain(self, proptype, shadowed_names={}) -> None:
-        for n in self._chain_to_top():
+        for n in self.chain:
             properties = n.get(proptype, None)
             if properties is not None:
                 h2 = H2("%s from %s" % (proptype.capitalize(), n['name']))
@@ -412,69 +769,264 @@ class TypePage(Page):
         self.intro.append(header)
 
 
-def copy(src_dir: str, dst_dir: str, include_fnames: Set = {}, exclude_fnames: Set = {}, templating: Dict = {}) -> None:
+def substitute_stream(in_f: TextIO, templating: Dict, chunk_size: int = COPY_CHUNK_SIZE) -> Iterator[str]:
+    """Read a template from a file in chunks and yield the substituted text piece
+    by piece, with the same result as Template(in_f.read()).substitute(templating).
+    Text is held back only from the start of a placeholder (or `$$` escape) that
+    may continue in the next chunk, so no placeholder is split between pieces."""
+    pending = ''
+    for chunk in iter(lambda: in_f.read(chunk_size), ''):
+        pending += chunk
+        cut = _complete_prefix_length(pending)
+        if cut:
+            yield Template(pending[:cut]).substitute(templating)
+            pending = pending[cut:]
+    if pending:
+        yield Template(pending).substitute(templating)
+
+
+def _complete_prefix_length(text: str) -> int:
+    """Return the length of the longest prefix of a template text that does not
+    end in the middle of a placeholder."""
+    # start at the last run of $ characters, everything before it is complete
+    pos = text.rfind('$')
+    if pos < 0:
+        return len(text)
+    while pos > 0 and text[pos - 1] == '$':
+        pos -= 1
+    while pos < len(text) and text[pos] == '$':
+        mo = Template.pattern.match(text, pos)
+        if mo is None or mo.group('invalid') is not None:
+            # either an error or a placeholder that is not complete yet
+            break
+        if mo.group('named') is not None and mo.end() == len(text):
+            # the identifier may continue in the next chunk
+            break
+        pos = mo.end()
+    else:
+        return len(text)
+    return pos
+
+
+def copy_templated_file(src: str, dst: str, templating: Dict) -> None:
+    """Write a template with substitutions to a file, leaving the destination
+    untouched if it already has the same contents."""
+    tmp = dst + '.tmp'
+    with open(src, 'r') as in_f, open(tmp, 'w') as out_f:
+        for piece in substitute_stream(in_f, templating):
+            out_f.write(piece)
+    if os.path.exists(dst) and filecmp.cmp(tmp, dst, shallow=False):
+        os.remove(tmp)
+    else:
+        os.replace(tmp, dst)
+
+
+def copy_file(src: str, dst: str) -> None:
+    """Copy a file, unless the destination already has the same contents."""
+    if not (os.path.exists(dst) and filecmp.cmp(src, dst, shallow=False)):
+        shutil.copy(src, dst)
+
+
+def copy(src_dir: str, dst_dir: str, include_fnames: Set = {}, exclude_fnames: Set = {}, templating: Dict = {},
+         manifest: Optional[BuildManifest] = None, num_threads: int = COPY_THREADS) -> None:
+    copy_jobs = []
     for r, ds, fs in os.walk(src_dir):
         r = r[len(src_dir)+1:]
         for f in fs:
             if f.startswith('.') or r in exclude_fnames or f in exclude_fnames:
                 continue
             elif not include_fnames or f in include_fnames:
+                if manifest is not None and manifest.is_fresh(
+                        pjoin(dst_dir, r, f), digest(file_digest(pjoin(src_dir, r, f)), templating)):
+                    continue
                 os.makedirs(pjoin(dst_dir, r), exist_ok=True)
                 if templating and f.endswith('.json') or f.endswith('.md'):
-                    with open(pjoin(src_dir, r, f), 'r') as in_f, open(pjoin(dst_dir, r, f), 'w') as out_f:
-                        tmpl_to_compile = Template(in_f.read())
-                        compiled = tmpl_to_compile.substitute(templating)
-                        out_f.write(compiled)
+                    copy_jobs.append((copy_templated_file, (pjoin(src_dir, r, f), pjoin(dst_dir, r, f), templating)))
                 else:
-                    shutil.copy(pjoin(src_dir, r, f), pjoin(dst_dir, r))
-
-
-def check_version_exists(version: str):
-    try:
-        res = request.urlopen('https://api.github.com/repos/clamsproject/mmif/git/refs/tags')
-        body = json.loads(res.read())
-        tags = [os.path.basename(tag['ref']) for tag in body]
-        if version in tags:
-            raise RuntimeError(f"{version} already exists, can't overwrite an exising version.")
-    except urllib.error.URLError:
-        warnings.warn(f"Cannot connect to the remote repository.\n"
-                      f"Now using local git tags to check version conflict.",
-                      category=RuntimeWarning)
-        proc = subprocess.run('git tag'.split(), cwd=os.path.abspath(os.path.dirname(__file__)), capture_output=True)
-        if version in proc.stdout.decode('ascii').split('\n'):
-            raise RuntimeError(f"{version} already exists, can't overwrite an exising version.")
-
+                    copy_jobs.append((copy_file, (pjoin(src_dir, r, f), pjoin(dst_dir, r, f))))
+    # copying is mostly waiting on file I/O, so threads are enough to run the jobs in parallel
+    with ThreadPoolExecutor(max_workers=max(num_threads, 1)) as executor:
+        futures = [executor.submit(fn, *fn_args) for fn, fn_args in copy_jobs]
+        for future in futures:
+            future.result()
+
+
+class GitObjects(object):
+    """A long-lived `git cat-file --batch` session to read any number of files
+    from any revision of the repository without starting a git process for each
+    of them. Also caches the list of local git tags."""
+
+    def __init__(self, cwd: str) -> None:
+        self.cwd = cwd
+        self._tags = None
+        self.proc = subprocess.Popen(['git', 'cat-file', '--batch'], cwd=cwd,
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def __enter__(self) -> 'GitObjects':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.proc.poll() is None:
+            self.proc.stdin.close()
+            self.proc.wait()
+
+    def tags(self) -> List[str]:
+        if self._tags is None:
+            proc = subprocess.run('git tag'.split(), cwd=self.cwd, capture_output=True)
+            self._tags = [t for t in proc.stdout.decode('ascii').split('\n') if t]
+        return self._tags
+
+    def read(self, revision: str, path: str) -> Optional[bytes]:
+        """Return the contents of a file at a revision, or None if the file does
+        not exist at that revision."""
+        self.proc.stdin.write(f'{revision}:{path}\n'.encode('utf8'))
+        self.proc.stdin.flush()
+        header = self.proc.stdout.readline().decode('utf8').split()
+        if len(header) != 3:
+            # "<object> missing" or "<object> ambiguous"
+            return None
+        size = int(header[2])
+        contents = self.proc.stdout.read(size)
+        # each object is followed by a newline
+        self.proc.stdout.read(1)
+        return contents
+
+    def read_yaml(self, revision: str, path: str) -> Optional[List[Dict]]:
+        contents = self.read(revision, path)
+        return None if contents is None else read_yaml(contents)
+
+    def read_json(self, revision: str, path: str) -> Optional[Dict]:
+        contents = self.read(revision, path)
+        return None if contents is None else json.loads(contents)
+
+
+class GitHubTags(object):
+    """Tag source that asks the GitHub API for the tags of the remote repository."""
+
+    def __init__(self, url: str = GITHUB_TAGS_URL, timeout: float = 10) -> None:
+        self.url = url
+        self.timeout = timeout
+
+    def tags(self) -> List[str]:
+        res = request.urlopen(self.url, timeout=self.timeout)
+        return [os.path.basename(tag['ref']) for tag in json.loads(res.read())]
+
+
+class ReleaseTags(object):
+    """Resolves the list of released versions. Tags from the remote source are
+    cached on disk for `ttl` seconds. When offline, or when the remote source
+    cannot be reached, the tags of the local git repository are used. The remote
+    source can be any object with a tags() method, so a local stand-in can be
+    plugged in."""
+
+    def __init__(self, git: GitObjects, remote=None, cache_fname: Optional[str] = None,
+                 ttl: float = 3600, offline: bool = False) -> None:
+        self.git = git
+        self.remote = GitHubTags() if remote is None else remote
+        self.cache_fname = cache_fname
+        self.ttl = ttl
+        self.offline = offline
+
+    def _read_cache(self) -> Optional[List[str]]:
+        if self.cache_fname is None or not os.path.exists(self.cache_fname):
+            return None
+        try:
+            with open(self.cache_fname) as cache_f:
+                cache = json.load(cache_f)
+            cached_time = cache['time']
+            tags = cache['tags']
+        except (ValueError, KeyError, TypeError):
+            # a truncated or corrupt cache is treated like an expired one
+            return None
+        if (type(cached_time) not in (int, float) or not isinstance(tags, list)
+                or not all(isinstance(tag, str) for tag in tags)):
+            return None
+        if time.time() - cached_time > self.ttl:
+            return None
+        return tags
+
+    def _write_cache(self, tags: List[str]) -> None:
+        if self.cache_fname is not None:
+            with open(self.cache_fname, 'w') as cache_f:
+                json.dump({'time': time.time(), 'tags': tags}, cache_f)
+
+    def tags(self) -> List[str]:
+        if self.offline:
+            return self.git.tags()
+        tags = self._read_cache()
+        if tags is not None:
+            return tags
+        try:
+            tags = self.remote.tags()
+        except (urllib.error.URLError, OSError):
+            warnings.warn(f"Cannot connect to the remote repository.\n"
+                          f"Now using local git tags to check version conflict.",
+                          category=RuntimeWarning)
+            return self.git.tags()
+        self._write_cache(tags)
+        return tags
+
+
+def check_version_exists(version: str, release_tags: Optional[ReleaseTags] = None):
+    if release_tags is None:
+        with GitObjects(os.path.abspath(os.path.dirname(__file__))) as git:
+            return check_version_exists(version, ReleaseTags(git))
+    if version in release_tags.tags():
+        raise RuntimeError(f"{version} already exists, can't overwrite an exising version.")
 
 
 def build(dirname, args):
     
     version = open(pjoin(dirname, 'VERSION')).read().strip()
-    check_version_exists(version)
-    out_dir = pjoin(dirname, args.testdir, version) if args.testdir else pjoin(dirname, 'docs', version)
-    jekyll_conf_file = pjoin(dirname, 'docs', '_config.yml')
-    vocab_src_dir = pjoin(dirname, 'vocabulary')
-    spec_src_dir = pjoin(dirname, 'specifications')
-    schema_src_dir = pjoin(dirname, 'schema')
-    context_src_dir = pjoin(dirname, 'context')
-    vocab_index_out_dir = pjoin(out_dir, 'vocabulary')
-    # vocab items will have individual versions, thus they won't be placed in the MMIF version directory
-    vocab_items_out_dir = pjoin(os.path.dirname(out_dir), 'vocabulary')
-    vocab_css_out_dir = pjoin(vocab_index_out_dir, 'css')
-    schema_out_dir = pjoin(out_dir, 'schema')
-    context_out_dir = pjoin(out_dir, 'context')
-    shutil.rmtree(out_dir, ignore_errors=True)
-
-    print(f"\n>>> Building vocabulary: index in {vocab_index_out_dir}, items in {vocab_items_out_dir}")
-    vocab_tree = build_vocab(vocab_src_dir, vocab_index_out_dir, version, vocab_items_out_dir)
+    incremental = getattr(args, 'incremental', False)
+    # one timestamp for all pages and the profile, also when pages are rendered in worker processes
+    build_time = time.localtime()
+    num_jobs = getattr(args, 'jobs', 1)
+    set_renderer(getattr(args, 'renderer', RENDERER))
+    profile = BuildProfile(enabled=getattr(args, 'profile', None) is not None)
+    with GitObjects(dirname) as git:
+        check_version_exists(version, ReleaseTags(git,
+                                                  remote=GitHubTags(timeout=getattr(args, 'tags_timeout', 10)),
+                                                  cache_fname=pjoin(dirname, TAGS_CACHE_FILENAME),
+                                                  ttl=getattr(args, 'tags_ttl', 3600),
+                                                  offline=getattr(args, 'offline', False)))
+        out_dir = pjoin(dirname, args.testdir, version) if args.testdir else pjoin(dirname, 'docs', version)
+        jekyll_conf_file = pjoin(dirname, 'docs', '_config.yml')
+        vocab_src_dir = pjoin(dirname, 'vocabulary')
+        spec_src_dir = pjoin(dirname, 'specifications')
+        schema_src_dir = pjoin(dirname, 'schema')
+        context_src_dir = pjoin(dirname, 'context')
+        vocab_index_out_dir = pjoin(out_dir, 'vocabulary')
+        # vocab items will have individual versions, thus they won't be placed in the MMIF version directory
+        vocab_items_out_dir = pjoin(os.path.dirname(out_dir), 'vocabulary')
+        vocab_css_out_dir = pjoin(vocab_index_out_dir, 'css')
+        schema_out_dir = pjoin(out_dir, 'schema')
+        context_out_dir = pjoin(out_dir, 'context')
+        if not incremental:
+            shutil.rmtree(out_dir, ignore_errors=True)
+        # outputs go to the version directory and to the vocabulary directory next to it
+        manifest = BuildManifest(pjoin(dirname, BUILD_MANIFEST_DIRNAME,
+                                       os.path.relpath(out_dir, dirname).replace(os.sep, '-') + '.json'),
+                                 os.path.dirname(out_dir)) if incremental else None
+
+        print(f"\n>>> Building vocabulary: index in {vocab_index_out_dir}, items in {vocab_items_out_dir}")
+        vocab_tree = build_vocab(vocab_src_dir, vocab_index_out_dir, version, vocab_items_out_dir, manifest, num_jobs,
+                                 compare=getattr(args, 'compare_renderers', False), git=git, profile=profile,
+                                 build_time=build_time)
 
     print("\n>>> Creating directory structure in '%s'" % out_dir)
     os.makedirs(out_dir, exist_ok=True)
 
     print("\n>>> Building specification in '%s'" % out_dir)
-    build_spec(spec_src_dir, out_dir, version, {t['name']: t['version'] for t in vocab_tree.types})
+    with profile.stage('spec copy'):
+        build_spec(spec_src_dir, out_dir, version, {t['name']: t['version'] for t in vocab_tree.types}, manifest)
 
     print("\n>>> Building json schema in '%s'" % out_dir)
-    build_schema(schema_src_dir, schema_out_dir, version)
+    with profile.stage('schema copy'):
+        build_schema(schema_src_dir, schema_out_dir, version, manifest)
 
     if INCLUDE_CONTEXT:
         # TODO: this is actually broken
@@ -483,26 +1035,82 @@ def build(dirname, args):
 
     if args.testdir is None:
         print("\n>>> Updating jekyll configuration in '%s'" % jekyll_conf_file)
-        update_jekyll_config(jekyll_conf_file, version)
+        with profile.stage('jekyll config update'):
+            update_jekyll_config(jekyll_conf_file, version)
+
+    if manifest is not None:
+        manifest.save()
+    if profile.enabled:
+        profile.print_summary()
+        profile.save(args.profile, build_time)
+        print(f"\n>>> Build profile written to '{args.profile}'")
 
     
-def build_spec(src, dst, mmif_version, attypes_versions):
+def build_spec(src, dst, mmif_version, attypes_versions, manifest=None):
     version_dict = collections.defaultdict(lambda: 'v1')
     for name, version in attypes_versions.items():
         version_dict[f"{name}_VER"] = version 
     version_dict['VERSION'] = mmif_version
-    copy(src, dst, exclude_fnames={'next.md', 'notes', 'samples/others', 'samples/everything/scripts'}, templating=version_dict)
+    copy(src, dst, exclude_fnames={'next.md', 'notes', 'samples/others', 'samples/everything/scripts'}, templating=version_dict,
+         manifest=manifest)
 
 
-def build_schema(src, dst, version):
-    copy(src, dst, include_fnames=['lif.json', 'mmif.json'])
+def build_schema(src, dst, version, manifest=None):
+    copy(src, dst, include_fnames=['lif.json', 'mmif.json'], manifest=manifest)
 
 
 def build_context(src, dst, version):
     copy(src, dst, exclude_fnames=['example.json'])
 
 
-def build_vocab(src, index_dir, mmif_version, item_dir) -> Tree:
+def how_different(type1, type2):
+    """
+    return 0 if the types are the same, 
+    1 if the differences should be propagated to the children
+    2 if the types are different in description and parent-ship only (no propagation),
+    """
+    for inheritable in ('properties', 'metadata'):
+        if type1.get(inheritable, {}) != type2.get(inheritable, {}):
+            return 1
+    if type1['description'] != type2['description'] or type1['parent'] != type2['parent']:
+        return 2
+    return 0
+
+
+def propagate_version_changes(root: Dict, old_types: Dict[str, Dict]) -> Dict[str, bool]:
+    """Compare the types under root with the same types in the previous release
+    and return a dict that tells for each type name whether its version should
+    be increased. Changes in inheritable properties are propagated to all
+    descendants. The tree is walked with an explicit stack, so deep hierarchies
+    don't run into the recursion limit."""
+    updated = collections.defaultdict(lambda: False)
+    agenda = [(root, False)]
+    while agenda:
+        node, parent_changed = agenda.pop()
+        if node['name'] not in old_types:
+            # a newly added type, don't propagate to its children
+            updated[node['name']] = False
+            children_changed = False
+        elif parent_changed:
+            updated[node['name']] = True
+            children_changed = True
+        else:
+            difference = how_different(node, old_types[node['name']])
+            if difference > 0:
+                updated[node['name']] = True
+            children_changed = difference == 1
+        agenda.extend((child, children_changed) for child in node['childNodes'])
+    return updated
+
+
+def build_vocab(src, index_dir, mmif_version, item_dir, manifest=None, num_jobs=1, compare=False,
+                git=None, profile=None, build_time=None) -> Tree:
+    if git is None:
+        with GitObjects(os.path.abspath(os.path.dirname(__file__))) as git:
+            return build_vocab(src, index_dir, mmif_version, item_dir, manifest, num_jobs, compare, git, profile,
+                               build_time)
+    if build_time is None:
+        build_time = time.localtime()
     vocab_yaml_path = os.path.relpath(pjoin(src, "clams.vocabulary.yaml"), os.path.dirname(__file__))
     for d in (index_dir, item_dir):
         css_dir = pjoin(d, 'css')
@@ -510,78 +1118,64 @@ def build_vocab(src, index_dir, mmif_version, item_dir) -> Tree:
         shutil.copy(pjoin(src, 'lappsstyle.css'), css_dir)
 
     cwd = os.path.abspath(os.path.dirname(__file__))
-    git_tags = subprocess.run('git tag'.split(), cwd=cwd, capture_output=True).stdout.decode('ascii').split('\n')
+    if profile is None:
+        profile = BuildProfile()
+    profile.start('vocab diff')
     old_vers = sorted([
-        tag for tag in git_tags if tag and re.match(r'\d+\.\d+\.\d+$', tag) and ver_parse(tag) < ver_parse(mmif_version)])
+        tag for tag in git.tags() if re.match(r'\d+\.\d+\.\d+$', tag) and ver_parse(tag) < ver_parse(mmif_version)])
     last_ver = old_vers[-1]
-    proc = subprocess.run(f'git show {last_ver}:{vocab_yaml_path}'.split(), cwd=cwd, capture_output=True)
-    if proc.returncode != 0:
+    last_clams_types = git.read_yaml(last_ver, vocab_yaml_path)
+    if last_clams_types is None:
         raise SystemError('cannot checkout latest vocab yaml to compute changes in vocab')
-    last_clams_types = read_yaml(subprocess.run(f'git show {last_ver}:{vocab_yaml_path}'.split(), cwd=cwd, capture_output=True).stdout)
     new_clams_types = read_yaml(vocab_yaml_path)
 
     attype_versions_included = collections.defaultdict(lambda: collections.defaultdict(list))
     latest_attype_vers = collections.defaultdict(lambda: 1)
+    attype_index = AttypeVersionsIndex(pjoin(item_dir, ATTYPE_VERSIONS_INDEX_JSONFILENAME))
     for old_ver in old_vers:
+        if old_ver in attype_index.releases:
+            continue
         old_attype_versions_fname = os.path.join(cwd, 'docs', str(old_ver), 'vocabulary', ATTYPE_VERSIONS_JSONFILENAME)
-        if not os.path.exists(old_attype_versions_fname):
-            # see https://github.com/clamsproject/mmif/issues/14#issuecomment-1504439497 
-            # to see why only this one gets v2 to start
-            latest_attype_vers['Annotation'] = 2
-        else:
+        old_attype_versions = None
+        if os.path.exists(old_attype_versions_fname):
             old_attype_versions = json.load(open(old_attype_versions_fname))
-            for attypename, attypever in old_attype_versions.items():
-                if old_ver == last_ver:
-                    latest_attype_vers[attypename] = int(re.sub(r'[^0-9.]+', '', attypever))
-                attype_versions_included[attypename][attypever].append(old_ver)
+        attype_index.add_release(old_ver, old_attype_versions)
+    old_vers_set = set(old_vers)
+    for attypename, versions in attype_index.attypes.items():
+        for attypever, releases in versions.items():
+            attype_versions_included[attypename][attypever] = [r for r in releases if r in old_vers_set]
+    last_attype_versions = attype_index.release_versions(last_ver)
+    if not last_attype_versions:
+        # see https://github.com/clamsproject/mmif/issues/14#issuecomment-1504439497 
+        # to see why only this one gets v2 to start
+        latest_attype_vers['Annotation'] = 2
+    for attypename, attypever in last_attype_versions.items():
+        latest_attype_vers[attypename] = int(re.sub(r'[^0-9.]+', '', attypever))
             
     old_types = {t['name']: t for t in last_clams_types}
     tree = Tree(new_clams_types)
+    profile.stop()
     
-    def how_different(type1, type2):
-        """
-        return 0 if the types are the same, 
-        1 if the differences should be propagated to the children
-        2 if the types are different in description and parent-ship only (no propagation),
-        """
-        for inheritable in ('properties', 'metadata'):
-            if type1.get(inheritable, {}) != type2.get(inheritable, {}):
-                return 1
-        if type1['description'] != type2['description'] or type1['parent'] != type2['parent']:
-            return 2
-        return 0
-
-    updated = collections.defaultdict(lambda: False)
-    
-    def propagate_version_changes(node, parent_changed=False):
-        if node['name'] not in old_types:
-            # a newly added type, don't propagate to its children
-            updated[node['name']] = False
-            for child in node['childNodes']:
-                propagate_version_changes(child, False)
-
-        elif parent_changed:
-            updated[node['name']] = True
-            for child in node['childNodes']:
-                propagate_version_changes(child, True)
-        else:
-            difference = how_different(node, old_types[node['name']])
-            if difference > 0:
-                updated[node['name']] = True
-            for child in node['childNodes']:
-                propagate_version_changes(child, difference == 1)
-    
-    root = tree.root
-    propagate_version_changes(root, False)
+    profile.start('version propagation')
+    updated = propagate_version_changes(tree.root, old_types)
 
     for t in new_clams_types:
         v = latest_attype_vers[t['name']]
         if updated[t['name']]:
             v += 1
         t['version'] = format_attype_version(v)
+    profile.stop()
+
+    # pages are collected as (page_maker, arguments) jobs with plain type dictionaries, so they can
+    # be sent to worker processes without pickling the parentNode/childNodes cycles of the tree
+    index_jobs = []
+    type_jobs = []
 
     # the main `x.y.z/vocabulary/index.html` page with the vocab tree
-    IndexPage(tree, index_dir, mmif_version).write()
+    plain_types = [plain_type(t) for t in tree.types]
+    if manifest is None or not manifest.is_fresh(pjoin(index_dir, 'index.html'),
+                                                 digest(BUILD_SCRIPT_DIGEST, mmif_version, plain_types)):
+        index_jobs.append((make_index_page, (plain_types, index_dir, mmif_version, build_time)))
     # then, redirection HTML files for each vocab types to its own versioned html page
     # (then, we decided not to do the redirection because it also adds confusions by 
     # reifying URLs for non-existing IRIs e.g. https://mmif.clams.ai/0.5.0/vocabulary/TimeFrame)
@@ -597,17 +1191,94 @@ def build_vocab(src, index_dir, mmif_version, item_dir) -> Tree:
     # JSON to keep the versions of individual vocab types that will be used in the next release cycle
     with open(pjoin(index_dir, ATTYPE_VERSIONS_JSONFILENAME), 'w') as attype_versions_jsonfile:
         json.dump({t['name']: t['version'] for t in tree.types}, attype_versions_jsonfile)
+    attype_index.add_release(mmif_version, {t['name']: t['version'] for t in tree.types})
+    attype_index.save()
 
     # finally, individually versioned annotation types pages
     for clams_type in tree.types:
-        TypePage(clams_type, item_dir, 
-                 # theoretically, `mmif_version` is a new string and shouldn't be in the `attype_vers_incl` dict. 
-                 # so we add the "current" (new) version to include this current at_type
-                 included_in=attype_versions_included[clams_type['name']][clams_type['version']] + [mmif_version]
-                 ).write()
+        # theoretically, `mmif_version` is a new string and shouldn't be in the `attype_vers_incl` dict. 
+        # so we add the "current" (new) version to include this current at_type
+        included_in = attype_versions_included[clams_type['name']][clams_type['version']] + [mmif_version]
+        # a type page depends on the type itself, the names, versions and properties of its ancestors
+        # and the releases it is included in
+        chain = [{k: n.get(k) for k in ('name', 'version', 'metadata', 'properties')}
+                 for n in tree.ancestors(clams_type['name'])]
+        type_page_fname = pjoin(item_dir, clams_type['name'], clams_type['version'], 'index.html')
+        if manifest is not None and manifest.is_fresh(
+                type_page_fname, digest(BUILD_SCRIPT_DIGEST, plain_type(clams_type), chain, included_in)):
+            continue
+        type_jobs.append((make_type_page, (plain_type(clams_type), chain, item_dir, included_in, build_time)))
+
+    if compare:
+        mismatches = compare_renderers(index_jobs + type_jobs)
+        if mismatches:
+            raise RuntimeError('renderers disagree on: ' + ', '.join(mismatches))
+    with profile.stage('index render'):
+        run_jobs([(write_page, (RENDERER, make_page, page_args)) for make_page, page_args in index_jobs])
+    with profile.stage('type render'):
+        if profile.enabled and num_jobs <= 1:
+            # measure each page on its own, that is only possible when they are all rendered here
+            for make_page, page_args in type_jobs:
+                with profile.stage(f"{page_args[0]['name']}/{page_args[0]['version']}"):
+                    write_page(RENDERER, make_page, page_args)
+        else:
+            run_jobs([(write_page, (RENDERER, make_page, page_args)) for make_page, page_args in type_jobs],
+                     num_jobs)
     return tree
 
 
+def make_index_page(clams_types: List[Dict], outdir: str, mmif_version: str,
+                    build_time: Optional[time.struct_time] = None) -> IndexPage:
+    """Build the vocabulary index page from plain type dictionaries."""
+    return IndexPage(Tree(clams_types), outdir, mmif_version, build_time)
+
+
+def make_type_page(clams_type: Dict, chain: List[Dict], outdir: str, included_in: List[str],
+                   build_time: Optional[time.struct_time] = None) -> TypePage:
+    """Build a type page from a plain type dictionary and the plain dictionaries
+    of its ancestors, ordered from the parent up to the root. The build time is
+    passed along so that pages rendered in worker processes get the same one."""
+    return TypePage(clams_type, outdir, included_in=included_in, chain=chain, build_time=build_time)
+
+
+def write_page(renderer: str, make_page, page_args) -> None:
+    """Build a page with the given renderer and write it."""
+    set_renderer(renderer)
+    make_page(*page_args).write()
+
+
+def compare_renderers(page_jobs: List) -> List[str]:
+    """Build all pages with each of the renderers and return the file names of
+    the pages where the serialized HTML is not identical."""
+    current = RENDERER
+    mismatches = []
+    try:
+        for make_page, page_args in page_jobs:
+            rendered = set()
+            for renderer in RENDERERS:
+                set_renderer(renderer)
+                page = make_page(*page_args)
+                rendered.add(page.render())
+            if len(rendered) > 1:
+                mismatches.append(page.fname)
+    finally:
+        set_renderer(current)
+    return mismatches
+
+
+def run_jobs(jobs: List, num_jobs: int = 1) -> None:
+    """Run a list of (function, arguments) jobs, in a pool of worker processes
+    if more than one job is requested. Exceptions from workers are re-raised."""
+    if num_jobs > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=num_jobs) as executor:
+            futures = [executor.submit(fn, *fn_args) for fn, fn_args in jobs]
+            for future in futures:
+                future.result()
+    else:
+        for fn, fn_args in jobs:
+            fn(*fn_args)
+
+
 def update_jekyll_config(infname, version):
     outfname = infname + '.new'
     with open(infname) as config_f, \
@@ -628,6 +1299,34 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument('--test', dest="testdir", nargs="?", default=None, const='testbuild',
                         help='build version in test output directory')
+    parser.add_argument('--incremental', action='store_true',
+                        help='keep the existing output directory and only regenerate outputs whose inputs '
+                             f'changed since the last incremental build (as recorded in {BUILD_MANIFEST_DIRNAME}/)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of worker processes used to render vocabulary pages')
+    parser.add_argument('--renderer', choices=RENDERERS, default=RENDERER,
+                        help='backend used to build the HTML of vocabulary pages, `string` skips BeautifulSoup '
+                             'and writes the same HTML with lightweight elements')
+    parser.add_argument('--compare-renderers', action='store_true',
+                        help='before writing, build every vocabulary page with all renderers '
+                             'and stop if their output is not byte-for-byte identical')
+    parser.add_argument('--offline', action='store_true',
+                        help='do not ask GitHub for released versions, only use local git tags')
+    parser.add_argument('--tags-timeout', type=float, default=10,
+                        help='timeout in seconds for the request to GitHub for released versions')
+    parser.add_argument('--tags-ttl', type=float, default=3600,
+                        help=f'number of seconds released versions from GitHub are cached in {TAGS_CACHE_FILENAME}')
+    parser.add_argument('--attype-index', choices=('check', 'rebuild'), default=None,
+                        help=f'instead of building, compare docs/vocabulary/{ATTYPE_VERSIONS_INDEX_JSONFILENAME} '
+                             'with one regenerated from the docs directory (check), or replace it (rebuild)')
+    parser.add_argument('--profile', nargs='?', default=None, const='buildprofile.json',
+                        help='measure time and memory of the build stages, print a summary and write a JSON report '
+                             'to the given file (default: buildprofile.json)')
     args = parser.parse_args()
     print(args)
-    build(dirname, args)
+    if args.attype_index is not None:
+        if not check_attype_versions_index(dirname, rebuild=args.attype_index == 'rebuild'):
+            if args.attype_index == 'check':
+                raise SystemExit(1)
+    else:
+        build(dirname, args)
@@ -0,0 +1,110 @@
+"""append.py
+
+Add a view to a MMIF file without reading and rewriting the whole file.
+
+The new view is validated against the view definition in mmif.json and is then
+written into the file just before the bracket that closes the list of views,
+so only the bytes after that bracket are written again. The position of that
+bracket and the identifiers of the views are kept in a small file next to the
+MMIF file, so that only the first append has to scan the MMIF file. The side
+file is ignored and recreated when the MMIF file was changed by other means.
+
+```bash
+$> python append.py raw.json new-view.json
+```
+
+"""
+
+
+import argparse
+import json
+import os
+
+import validate
+from jsonscanner import JSONScanner
+
+
+# not ending in .json or .mmif, so that tools that collect MMIF files in a directory skip it
+SIDE_FILE_SUFFIX = '.views'
+
+
+def side_file(fname):
+    return fname + SIDE_FILE_SUFFIX
+
+
+def scan_views(fname):
+    """Return the byte offset of the bracket that closes the views list of a MMIF
+    file and the identifiers of the views. The file is read as Latin-1 so that
+    character offsets are byte offsets."""
+    with open(fname, encoding='latin-1', newline='') as fh:
+        scanner = JSONScanner(fh)
+        for key in scanner.members():
+            if key != 'views':
+                scanner.value()
+                continue
+            view_ids = []
+            for _ in scanner.elements():
+                for view_key in scanner.members():
+                    if view_key == 'id':
+                        start = position(scanner)
+                        scanner.value()
+                        raw = scanner.buffer[start - scanner.offset:scanner.pos]
+                        view_ids.append(json.loads(raw.encode('latin-1')))
+                    else:
+                        scanner.value()
+            # the scanner has just read the closing bracket
+            return scanner.offset + scanner.pos - 1, view_ids
+    raise ValueError('%s has no views' % fname)
+
+
+def position(scanner):
+    scanner.peek()
+    return scanner.offset + scanner.pos
+
+
+def load_views_info(fname):
+    """Return the position of the end of the views list and the view identifiers,
+    from the side file if it is up to date and else by scanning the file."""
+    stat = os.stat(fname)
+    try:
+        with open(side_file(fname)) as fh:
+            info = json.load(fh)
+        if info['size'] == stat.st_size and info['mtime'] == stat.st_mtime:
+            return info['end'], info['ids']
+    except (OSError, ValueError, KeyError):
+        pass
+    return scan_views(fname)
+
+
+def append_view(fname, view, schema_file=validate.MMIF_SCHEMA):
+    """Add a view, given as a JSON object, to the end of the views in a MMIF file.
+    Raises a ValidationError if the view is not valid and a ValueError if the
+    file already has a view with the same identifier."""
+    end, view_ids = load_views_info(fname)
+    validator = validate.get_validator(schema_file)
+    validator.validate(view, 'view', ((None, 'views'), len(view_ids)))
+    if view['id'] in view_ids:
+        raise ValueError('%s already has a view %s' % (fname, view['id']))
+    data = json.dumps(view, ensure_ascii=False).encode('utf8')
+    if view_ids:
+        data = b',' + data
+    with open(fname, 'r+b') as fh:
+        fh.seek(end)
+        tail = fh.read()
+        fh.seek(end)
+        fh.write(data + tail)
+    view_ids.append(view['id'])
+    stat = os.stat(fname)
+    with open(side_file(fname), 'w') as fh:
+        json.dump({'size': stat.st_size, 'mtime': stat.st_mtime, 'end': end + len(data), 'ids': view_ids}, fh)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Add a view to a MMIF file.')
+    parser.add_argument('mmif_file', help='MMIF file to add the view to')
+    parser.add_argument('view_file', help='JSON file with the view')
+    parser.add_argument('--schema', default=validate.MMIF_SCHEMA, help='schema file (default: mmif.json)')
+    args = parser.parse_args()
+    with open(args.view_file) as fh:
+        append_view(args.mmif_file, json.load(fh), args.schema)
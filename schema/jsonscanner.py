@@ -0,0 +1,108 @@
+"""jsonscanner.py
+
+Incremental JSON reader shared by the streaming tools: validate.py and
+append.py in this directory and mmifstream.py in the sample scripts.
+
+"""
+
+import json
+import re
+
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+
+class JSONScanner(object):
+
+    """Reads JSON text from a file in chunks, decoding one value at a time
+    while letting the caller walk through objects and arrays."""
+
+    def __init__(self, fh, chunk_size=1 << 16):
+        self.fh = fh
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        # file offset of the start of the buffer, used in error messages
+        self.offset = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size=None):
+        chunk = self.fh.read(size or self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def _error(self, message):
+        return ValueError('%s at character %d' % (message, self.offset + self.pos))
+
+    def peek(self):
+        """Skip whitespace and return the next character, or '' at the end."""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise self._error('expected %r but found %r' % (char, found))
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # a number may continue in the next chunk, so it is only complete
+                # when a character that cannot be part of it follows
+                if self.eof or (end < len(self.buffer) and self.buffer[end] not in NUMBER_CHARS):
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise self._error('invalid JSON value')
+            # read ever larger chunks so that large values are not decoded too often
+            self._fill(size)
+            size *= 2
+
+    def members(self):
+        """Iterate over the keys of the next object. After each key the caller
+        has to consume its value before asking for the next key."""
+        self.expect('{')
+        first = True
+        while True:
+            if self.peek() == '}':
+                self.pos += 1
+                return
+            if not first:
+                self.expect(',')
+            first = False
+            if self.peek() != '"':
+                raise self._error('expected a key')
+            key = self.value()
+            self.expect(':')
+            yield key
+
+    def elements(self):
+        """Iterate over the positions in the next array. Each time round the
+        caller has to consume the element before asking for the next one."""
+        self.expect('[')
+        i = 0
+        while True:
+            if self.peek() == ']':
+                self.pos += 1
+                return
+            if i:
+                self.expect(',')
+            yield i
+            i += 1
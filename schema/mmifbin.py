@@ -0,0 +1,354 @@
+"""mmifbin.py
+
+A compact binary encoding of MMIF, and a converter to and from JSON.
+
+Most of a MMIF file is lists of annotations that all have the same keys, with
+the same type URIs and property names over and over and a lot of integer
+offsets. This encoding stores
+
+- every distinct string once, in a string table at the start of the file,
+  so that keys, type URIs and other repeated values become small numbers
+- lists of objects (annotations, documents, views) as tables, with for each
+  distinct set of keys the values of each key stored together in a column
+- columns of integers and of strings as packed arrays, and columns of objects
+  (like the properties of annotations) as tables again
+
+Any JSON value can be encoded, not just valid MMIF, and decoding gives back the
+same value with the same key order, so converting JSON to this encoding and
+back is lossless. A file is laid out as follows, with all numbers little-endian
+and n a variable-length unsigned integer:
+
+    file    = "MMIFB" format-version:u8 strings value
+    strings = count:n code-point-lengths:u32[count] byte-length:n utf8-bytes
+    value   = "N" | "T" | "F" | "I" signed:n | "D" f64 | "S" string-index:n
+            | "L" count:n value* | "O" count:n (string-index:n value)*
+            | "A" table
+    table   = count:n shape-count:n (key-count:n string-index:n*)*
+              shape-of-each-row:u32[count] (only if there is more than one shape)
+              column* (one for each key of each shape, in order)
+    column  = "q" i64[rows] | "r" u32[rows] | "t" table | "v" value[rows]
+
+Signed integers are zigzag encoded. Use the script to convert files and to
+compare the sizes and parse times of the two encodings:
+
+```bash
+$> python mmifbin.py encode raw.json raw.mmifb
+$> python mmifbin.py decode raw.mmifb raw.json
+$> python mmifbin.py benchmark ../specifications/samples/*/*.json
+```
+
+"""
+
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+from itertools import accumulate
+
+
+MAGIC = b'MMIFB'
+FORMAT_VERSION = 1
+
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+DOUBLE = struct.Struct('<d')
+
+
+def packed(typecode, values):
+    """Return the little-endian bytes of an array of values."""
+    arr = array(typecode, values)
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def unpacked(typecode, data):
+    arr = array(typecode)
+    arr.frombytes(data)
+    if sys.byteorder == 'big':
+        arr.byteswap()
+    return arr
+
+
+class Encoder(object):
+
+    def __init__(self):
+        self.strings = {}
+        self.body = bytearray()
+
+    def string_index(self, string):
+        index = self.strings.get(string)
+        if index is None:
+            index = self.strings[string] = len(self.strings)
+        return index
+
+    def write_uint(self, number):
+        out = self.body
+        while number > 0x7f:
+            out.append((number & 0x7f) | 0x80)
+            number >>= 7
+        out.append(number)
+
+    def write_int(self, number):
+        self.write_uint(number * 2 if number >= 0 else -number * 2 - 1)
+
+    def write_value(self, value):
+        out = self.body
+        if value is None:
+            out += b'N'
+        elif value is True:
+            out += b'T'
+        elif value is False:
+            out += b'F'
+        elif type(value) is int:
+            out += b'I'
+            self.write_int(value)
+        elif type(value) is float:
+            out += b'D'
+            out += DOUBLE.pack(value)
+        elif type(value) is str:
+            out += b'S'
+            self.write_uint(self.string_index(value))
+        elif type(value) is list:
+            if len(value) > 1 and all(type(item) is dict for item in value):
+                out += b'A'
+                self.write_table(value)
+            else:
+                out += b'L'
+                self.write_uint(len(value))
+                for item in value:
+                    self.write_value(item)
+        elif type(value) is dict:
+            out += b'O'
+            self.write_uint(len(value))
+            for key, item in value.items():
+                self.write_uint(self.string_index(key))
+                self.write_value(item)
+        else:
+            raise TypeError('cannot encode %r' % type(value))
+
+    def write_table(self, rows):
+        shapes = {}
+        shape_of_rows = []
+        for row in rows:
+            shape = tuple(row)
+            shape_of_rows.append(shapes.setdefault(shape, len(shapes)))
+        self.write_uint(len(rows))
+        self.write_uint(len(shapes))
+        for shape in shapes:
+            self.write_uint(len(shape))
+            for key in shape:
+                self.write_uint(self.string_index(key))
+        if len(shapes) > 1:
+            self.body += packed('I', shape_of_rows)
+        for shape, number in shapes.items():
+            shape_rows = rows if len(shapes) == 1 else [r for r, s in zip(rows, shape_of_rows) if s == number]
+            for key in shape:
+                self.write_column([row[key] for row in shape_rows])
+
+    def write_column(self, values):
+        types = {type(value) for value in values}
+        if types == {int} and INT64_MIN <= min(values) and max(values) <= INT64_MAX:
+            self.body += b'q'
+            self.body += packed('q', values)
+        elif types == {str}:
+            self.body += b'r'
+            self.body += packed('I', [self.string_index(value) for value in values])
+        elif types == {dict}:
+            self.body += b't'
+            self.write_table(values)
+        else:
+            self.body += b'v'
+            for value in values:
+                self.write_value(value)
+
+    def encode(self, value):
+        """Return the encoding of a JSON value as bytes."""
+        self.write_value(value)
+        header = Encoder()
+        header.body += MAGIC
+        header.body.append(FORMAT_VERSION)
+        strings = list(self.strings)
+        header.write_uint(len(strings))
+        header.body += packed('I', [len(string) for string in strings])
+        blob = ''.join(strings).encode('utf8', 'surrogatepass')
+        header.write_uint(len(blob))
+        return bytes(header.body + blob + self.body)
+
+
+class Decoder(object):
+
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.pos = 0
+        if bytes(self.data[:len(MAGIC)]) != MAGIC:
+            raise ValueError('not a binary MMIF file')
+        if self.data[len(MAGIC)] != FORMAT_VERSION:
+            raise ValueError('unsupported format version %d' % self.data[len(MAGIC)])
+        self.pos = len(MAGIC) + 1
+        count = self.read_uint()
+        lengths = self.read_array('I', count)
+        size = self.read_uint()
+        text = str(self.data[self.pos:self.pos + size], 'utf8', 'surrogatepass')
+        self.pos += size
+        offsets = [0] + list(accumulate(lengths))
+        self.strings = [text[offsets[i]:offsets[i + 1]] for i in range(count)]
+
+    def read_uint(self):
+        data = self.data
+        number = shift = 0
+        while True:
+            byte = data[self.pos]
+            self.pos += 1
+            number |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return number
+            shift += 7
+
+    def read_int(self):
+        number = self.read_uint()
+        return number >> 1 if not number & 1 else -(number >> 1) - 1
+
+    def read_array(self, typecode, count):
+        size = array(typecode).itemsize * count
+        arr = unpacked(typecode, self.data[self.pos:self.pos + size])
+        self.pos += size
+        return arr
+
+    def read_value(self):
+        tag = self.data[self.pos]
+        self.pos += 1
+        if tag == 0x53:  # S
+            return self.strings[self.read_uint()]
+        if tag == 0x49:  # I
+            return self.read_int()
+        if tag == 0x4f:  # O
+            strings = self.strings
+            return {strings[self.read_uint()]: self.read_value() for _ in range(self.read_uint())}
+        if tag == 0x41:  # A
+            return self.read_table()
+        if tag == 0x4c:  # L
+            return [self.read_value() for _ in range(self.read_uint())]
+        if tag == 0x4e:  # N
+            return None
+        if tag == 0x54:  # T
+            return True
+        if tag == 0x46:  # F
+            return False
+        if tag == 0x44:  # D
+            value = DOUBLE.unpack_from(self.data, self.pos)[0]
+            self.pos += 8
+            return value
+        raise ValueError('unknown tag %r at byte %d' % (chr(tag), self.pos - 1))
+
+    def read_table(self):
+        count = self.read_uint()
+        shapes = []
+        for _ in range(self.read_uint()):
+            shapes.append([self.strings[self.read_uint()] for _ in range(self.read_uint())])
+        if len(shapes) == 1:
+            keys = shapes[0]
+            columns = [self.read_column(count) for _ in keys]
+            return [dict(zip(keys, row)) for row in zip(*columns)] if keys else [{} for _ in range(count)]
+        shape_of_rows = self.read_array('I', count)
+        shape_rows = []
+        for number, keys in enumerate(shapes):
+            size = shape_of_rows.count(number)
+            columns = [self.read_column(size) for _ in keys]
+            rows = [dict(zip(keys, row)) for row in zip(*columns)] if keys else [{} for _ in range(size)]
+            shape_rows.append(iter(rows))
+        return [next(shape_rows[number]) for number in shape_of_rows]
+
+    def read_column(self, count):
+        kind = self.data[self.pos]
+        self.pos += 1
+        if kind == 0x71:  # q
+            return self.read_array('q', count).tolist()
+        if kind == 0x72:  # r
+            strings = self.strings
+            return [strings[i] for i in self.read_array('I', count)]
+        if kind == 0x74:  # t
+            return self.read_table()
+        if kind == 0x76:  # v
+            return [self.read_value() for _ in range(count)]
+        raise ValueError('unknown column kind %r at byte %d' % (chr(kind), self.pos - 1))
+
+
+def dumps(value):
+    """Return the binary encoding of a JSON value."""
+    return Encoder().encode(value)
+
+
+def loads(data):
+    """Return the JSON value from its binary encoding."""
+    return Decoder(data).read_value()
+
+
+def encode_file(infile, outfile):
+    with open(infile) as fh:
+        value = json.load(fh)
+    with open(outfile, 'wb') as fh:
+        fh.write(dumps(value))
+
+
+def decode_file(infile, outfile, indent=2):
+    with open(infile, 'rb') as fh:
+        value = loads(fh.read())
+    with open(outfile, 'w') as fh:
+        json.dump(value, fh, indent=indent)
+
+
+def benchmark(fnames, repeat=5):
+    """Print the sizes of files as JSON and in the binary encoding, the time it
+    takes to parse them and whether they survive a round trip."""
+    def best_time(fn, arg):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(arg)
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    print('%-50s %10s %10s %6s %10s %10s %10s  %s'
+          % ('file', 'json', 'binary', 'ratio', 'json.load', 'encode', 'decode', 'round trip'))
+    for fname in fnames:
+        text = open(fname).read()
+        try:
+            value = json.loads(text)
+        except ValueError:
+            print('%-50s not valid JSON, skipped' % fname)
+            continue
+        # compare with the compact JSON form, which is what apps should exchange
+        json_size = len(json.dumps(value, separators=(',', ':')).encode('utf8'))
+        data = dumps(value)
+        lossless = json.dumps(loads(data)) == json.dumps(value)
+        print('%-50s %10d %10d %6.2f %9.2fms %9.2fms %9.2fms  %s'
+              % (fname[-50:], json_size, len(data), len(data) / json_size,
+                 best_time(json.loads, text) * 1000, best_time(dumps, value) * 1000,
+                 best_time(loads, data) * 1000, 'ok' if lossless else 'FAILED'))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Convert MMIF between JSON and the binary encoding.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for command, help_text in (('encode', 'convert a JSON file into a binary file'),
+                               ('decode', 'convert a binary file into a JSON file')):
+        subparser = subparsers.add_parser(command, help=help_text)
+        subparser.add_argument('infile')
+        subparser.add_argument('outfile')
+    subparser = subparsers.add_parser('benchmark', help='compare sizes and parse times on JSON files')
+    subparser.add_argument('files', nargs='+')
+    subparser.add_argument('--repeat', type=int, default=5, help='number of runs, the best run is reported')
+    args = parser.parse_args()
+    if args.command == 'encode':
+        encode_file(args.infile, args.outfile)
+    elif args.command == 'decode':
+        decode_file(args.infile, args.outfile)
+    else:
+        benchmark(args.files, args.repeat)
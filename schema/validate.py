@@ -0,0 +1,322 @@
+"""validate.py
+
+Validate MMIF files against the JSON schema in mmif.json.
+
+The schema is compiled once into nested Python functions, one for each part of
+the schema, with references resolved and pattern properties compiled up front,
+so that validating an instance does not have to interpret the schema again.
+Compiled validators are cached per schema file. Only the parts of JSON Schema
+draft-04 used by the MMIF and LIF schemas are supported, as with most validators
+the format keyword is not checked.
+
+Validation stops at the first failure and reports the JSON path of the failing
+value. Several files can be validated in parallel, and with --stream each file
+is read view by view so only one view has to be in memory at a time:
+
+```bash
+$> python validate.py ../specifications/samples/*/raw.json
+$> python validate.py -j 4 --stream huge.json
+```
+
+"""
+
+
+import argparse
+import functools
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from jsonscanner import JSONScanner
+
+
+MMIF_SCHEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mmif.json')
+
+JSON_TYPES = {
+    'object': lambda value: type(value) is dict,
+    'array': lambda value: type(value) is list,
+    'string': lambda value: type(value) is str,
+    'integer': lambda value: type(value) is int,
+    'number': lambda value: type(value) in (int, float),
+    'boolean': lambda value: type(value) is bool,
+    'null': lambda value: value is None}
+
+
+class ValidationError(Exception):
+
+    def __init__(self, message, path):
+        super().__init__(message)
+        self.message = message
+        self.path = path
+
+    def json_path(self):
+        return format_path(self.path)
+
+    def __str__(self):
+        return '%s: %s' % (self.json_path(), self.message)
+
+
+def format_path(path):
+    """Return a JSON path like $.views[2].id for a path, which is a linked list
+    of (parent, key) pairs so that no strings are made unless there is an error."""
+    keys = []
+    while path is not None:
+        path, key = path
+        keys.append(key)
+    steps = ['[%d]' % key if type(key) is int else '.%s' % key for key in reversed(keys)]
+    return '$' + ''.join(steps)
+
+
+class SchemaCompiler(object):
+
+    """Compiles a schema into a function that takes an instance and a path and
+    raises a ValidationError for the first failure."""
+
+    def __init__(self, schema):
+        self.schema = schema
+        # compiled references, filled in as they are needed, which also takes
+        # care of recursive references
+        self.refs = {}
+
+    def compile(self, schema=None):
+        schema = self.schema if schema is None else schema
+        checks = []
+        if '$ref' in schema:
+            return self.compile_ref(schema['$ref'])
+        if 'type' in schema:
+            checks.append(self.compile_type(schema['type']))
+        if 'enum' in schema:
+            checks.append(self.compile_enum(schema['enum']))
+        if 'minLength' in schema:
+            checks.append(self.compile_min_length(schema['minLength']))
+        if 'minimum' in schema:
+            checks.append(self.compile_minimum(schema['minimum']))
+        if 'required' in schema:
+            checks.append(self.compile_required(schema['required']))
+        if {'properties', 'patternProperties', 'additionalProperties'} & set(schema):
+            checks.append(self.compile_properties(schema))
+        if 'items' in schema:
+            checks.append(self.compile_items(schema['items']))
+        if 'allOf' in schema:
+            checks.extend(self.compile(sub) for sub in schema['allOf'])
+        if 'anyOf' in schema:
+            checks.append(self.compile_any_of(schema['anyOf']))
+        if 'oneOf' in schema:
+            checks.append(self.compile_one_of(schema['oneOf']))
+        if len(checks) == 1:
+            return checks[0]
+
+        def check(value, path):
+            for fn in checks:
+                fn(value, path)
+        return check
+
+    def compile_ref(self, ref):
+        if ref not in self.refs:
+            if not ref.startswith('#/'):
+                raise ValueError('only local references are supported: %s' % ref)
+            self.refs[ref] = None
+            target = self.schema
+            for step in ref[2:].split('/'):
+                target = target[step]
+            self.refs[ref] = self.compile(target)
+        refs = self.refs
+        return lambda value, path: refs[ref](value, path)
+
+    def compile_type(self, json_type):
+        types = [json_type] if type(json_type) is str else json_type
+        tests = [JSON_TYPES[t] for t in types]
+        message = 'expected %s' % ' or '.join(types)
+
+        def check(value, path):
+            for test in tests:
+                if test(value):
+                    return
+            raise ValidationError(message, path)
+        return check
+
+    def compile_enum(self, values):
+        def check(value, path):
+            if value not in values:
+                raise ValidationError('expected one of %s' % values, path)
+        return check
+
+    def compile_min_length(self, length):
+        def check(value, path):
+            if type(value) is str and len(value) < length:
+                raise ValidationError('string shorter than %d' % length, path)
+        return check
+
+    def compile_minimum(self, minimum):
+        def check(value, path):
+            if type(value) in (int, float) and value < minimum:
+                raise ValidationError('value less than %s' % minimum, path)
+        return check
+
+    def compile_required(self, required):
+        def check(value, path):
+            if type(value) is dict:
+                for prop in required:
+                    if prop not in value:
+                        raise ValidationError('missing required property %s' % prop, path)
+        return check
+
+    def compile_properties(self, schema):
+        properties = {prop: self.compile(sub) for prop, sub in schema.get('properties', {}).items()}
+        patterns = [(re.compile(pattern), self.compile(sub))
+                    for pattern, sub in schema.get('patternProperties', {}).items()]
+        additional = schema.get('additionalProperties', True)
+        if type(additional) is dict:
+            additional = self.compile(additional)
+
+        def check(value, path):
+            if type(value) is not dict:
+                return
+            for prop, item in value.items():
+                matched = False
+                if prop in properties:
+                    properties[prop](item, (path, prop))
+                    matched = True
+                for pattern, fn in patterns:
+                    if pattern.search(prop):
+                        fn(item, (path, prop))
+                        matched = True
+                if not matched:
+                    if additional is False:
+                        raise ValidationError('unexpected property %s' % prop, path)
+                    if additional is not True:
+                        additional(item, (path, prop))
+        return check
+
+    def compile_items(self, items):
+        if type(items) is list:
+            fns = [self.compile(sub) for sub in items]
+
+            def check(value, path):
+                if type(value) is list:
+                    for i, (item, fn) in enumerate(zip(value, fns)):
+                        fn(item, (path, i))
+            return check
+        fn = self.compile(items)
+
+        def check(value, path):
+            if type(value) is list:
+                for i, item in enumerate(value):
+                    fn(item, (path, i))
+        return check
+
+    def compile_any_of(self, schemas):
+        fns = [self.compile(sub) for sub in schemas]
+
+        def check(value, path):
+            for fn in fns:
+                try:
+                    fn(value, path)
+                    return
+                except ValidationError:
+                    pass
+            raise ValidationError('not valid under any of the given schemas', path)
+        return check
+
+    def compile_one_of(self, schemas):
+        fns = [self.compile(sub) for sub in schemas]
+
+        def check(value, path):
+            matches = 0
+            for fn in fns:
+                try:
+                    fn(value, path)
+                    matches += 1
+                except ValidationError:
+                    pass
+            if matches != 1:
+                raise ValidationError('valid under %d instead of exactly one of the given schemas' % matches, path)
+        return check
+
+
+class Validator(object):
+
+    """Compiled validator for a schema, with a function for the whole schema and
+    one for each of its definitions."""
+
+    def __init__(self, schema):
+        self.compiler = SchemaCompiler(schema)
+        self.check = self.compiler.compile()
+        self.definitions = {name: self.compiler.compile_ref('#/definitions/%s' % name)
+                            for name in schema.get('definitions', {})}
+        self.properties = {prop: self.compiler.compile(sub)
+                           for prop, sub in schema.get('properties', {}).items()}
+
+    def validate(self, instance, definition=None, path=None):
+        """Raise a ValidationError if the instance is not valid for the schema or
+        for one of its definitions."""
+        fn = self.check if definition is None else self.definitions[definition]
+        fn(instance, path)
+
+    def validate_stream(self, fh):
+        """Validate a MMIF file view by view, without loading all of it."""
+        scanner = JSONScanner(fh)
+        seen = set()
+        for key in scanner.members():
+            seen.add(key)
+            if key == 'views' and scanner.peek() != '[':
+                # not a list, which the schema reports with the path of the value
+                self.properties[key](scanner.value(), (None, key))
+            elif key == 'views':
+                for i in scanner.elements():
+                    self.validate(scanner.value(), 'view', ((None, 'views'), i))
+            elif key in self.properties:
+                self.properties[key](scanner.value(), (None, key))
+            else:
+                raise ValidationError('unexpected property %s' % key, None)
+        for prop in self.compiler.schema.get('required', []):
+            if prop not in seen:
+                raise ValidationError('missing required property %s' % prop, None)
+
+
+@functools.lru_cache(maxsize=None)
+def get_validator(schema_file=MMIF_SCHEMA):
+    with open(schema_file) as fh:
+        return Validator(json.load(fh))
+
+
+def validate_file(fname, schema_file=MMIF_SCHEMA, stream=False):
+    """Return None if the file is valid, and an error message otherwise."""
+    validator = get_validator(schema_file)
+    try:
+        with open(fname) as fh:
+            if stream:
+                validator.validate_stream(fh)
+            else:
+                validator.validate(json.load(fh))
+    except ValidationError as e:
+        return str(e)
+    except ValueError as e:
+        return 'invalid JSON: %s' % e
+    return None
+
+
+def validate_files(fnames, schema_file=MMIF_SCHEMA, stream=False, jobs=1):
+    """Validate files, in parallel if jobs is more than one, and return a list
+    of pairs of file name and error message (None for valid files)."""
+    validate = functools.partial(validate_file, schema_file=schema_file, stream=stream)
+    if jobs > 1 and len(fnames) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            return list(zip(fnames, executor.map(validate, fnames)))
+    return [(fname, validate(fname)) for fname in fnames]
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Validate MMIF files against the MMIF JSON schema.')
+    parser.add_argument('files', nargs='+', help='MMIF files to validate')
+    parser.add_argument('--schema', default=MMIF_SCHEMA, help='schema file (default: mmif.json)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of files to validate in parallel')
+    parser.add_argument('--stream', action='store_true', help='read files view by view')
+    args = parser.parse_args()
+    results = validate_files(args.files, args.schema, args.stream, args.jobs)
+    for fname, error in results:
+        print('%s: %s' % (fname, 'valid' if error is None else error))
+    sys.exit(1 if any(error is not None for _, error in results) else 0)
@@ -0,0 +1,132 @@
+"""alignments.py
+
+Graph of the alignments in a MMIF file, used to anchor annotations to times in
+the media.
+
+Annotations on text often only get a time by following alignments across
+views. For the New York entity in the example this goes from the NamedEntity
+to its TextDocument v6:td25, which is aligned to the BoundingBox v5:bb25 at
+time point 21000. Entities in the transcript are anchored through the tokens
+they overlap with, since each token is aligned to a TimeFrame.
+
+The graph is built once for a MMIF file, with for each fully qualified
+identifier the list of identifiers it is aligned to in either direction.
+Anchors that were found are cached so that anchoring all entities of a view
+does not repeat the same searches.
+
+"""
+
+from collections import namedtuple
+
+from utils import type_name
+
+
+# offsets are in the unit of the document, which is a time unit for all anchors
+Anchor = namedtuple('Anchor', ['document', 'unit', 'start', 'end'])
+
+
+def qualify(view, anno_id, documents):
+    """Return the fully qualified identifier for an identifier used in a view.
+    Identifiers of top-level documents and identifiers that already have a view
+    prefix are left alone."""
+    if ':' in anno_id or anno_id in documents:
+        return anno_id
+    return '%s:%s' % (view.id, anno_id)
+
+
+class AlignmentGraph(object):
+
+    """The alignments of a MMIF file, created from a pbcore.MMIF."""
+
+    def __init__(self, mmif):
+        self.mmif = mmif
+        self.anchor_index = mmif.get_anchor_index()
+        self.documents = {doc['properties']['id'] for doc in mmif.documents}
+        self.edges = {}
+        self._anchors = {}
+        for view in mmif.views:
+            for anno in view.get_annotations('Alignment'):
+                source = qualify(view, anno.get_property('source'), self.documents)
+                target = qualify(view, anno.get_property('target'), self.documents)
+                self.edges.setdefault(source, []).append(target)
+                self.edges.setdefault(target, []).append(source)
+
+    def aligned(self, long_id):
+        """Return the identifiers of everything aligned to an identifier."""
+        return self.edges.get(long_id, [])
+
+    def own_anchor(self, anno):
+        """Return the anchor of an annotation if it has time offsets itself."""
+        document, unit = self.anchor_index.document_and_unit(anno.view, anno)
+        if unit == 'characters':
+            return None
+        start = anno.get_property('start')
+        end = anno.get_property('end')
+        if start is not None and end is not None:
+            return Anchor(document, unit, start, end)
+        point = anno.get_property('timePoint')
+        if point is not None:
+            return Anchor(document, unit, point, point)
+        return None
+
+    def follow(self, long_id):
+        """Return the anchor of the nearest annotation reachable through
+        alignments that has time offsets, searching breadth first."""
+        visited = {long_id}
+        queue = [long_id]
+        for node in queue:
+            anno = self.mmif.get_annotation(node)
+            if anno is not None:
+                anchor = self.own_anchor(anno)
+                if anchor is not None:
+                    return anchor
+            for neighbour in self.aligned(node):
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    queue.append(neighbour)
+        return None
+
+    def anchor(self, anno):
+        """Return the Anchor in media time of an annotation, or None if it cannot
+        be anchored. Tried in turn are the offsets of the annotation itself, the
+        tokens it overlaps with, its alignments and the alignments of its
+        document."""
+        long_id = qualify(anno.view, anno.id, self.documents)
+        if long_id in self._anchors:
+            return self._anchors[long_id]
+        anchor = self.own_anchor(anno) or self._anchor_through_tokens(anno)
+        if anchor is None:
+            anchor = self.follow(long_id)
+        if anchor is None:
+            document = self.anchor_index.document_and_unit(anno.view, anno)[0]
+            if document is not None:
+                if document not in self._anchors:
+                    self._anchors[document] = self.follow(document)
+                anchor = self._anchors[document]
+        self._anchors[long_id] = anchor
+        return anchor
+
+    def _anchor_through_tokens(self, anno):
+        document, unit = self.anchor_index.document_and_unit(anno.view, anno)
+        start = anno.get_property('start')
+        end = anno.get_property('end')
+        if unit != 'characters' or start is None or end is None:
+            return None
+        anchors = []
+        for token in self.anchor_index.overlapping(document, start, end, unit):
+            if token is not anno and type_name(token.type) == 'Token':
+                anchor = self.follow(qualify(token.view, token.id, self.documents))
+                if anchor is not None:
+                    anchors.append(anchor)
+        if not anchors:
+            return None
+        first = anchors[0]
+        anchors = [a for a in anchors if a[:2] == first[:2]]
+        return Anchor(first.document, first.unit,
+                      min(a.start for a in anchors), max(a.end for a in anchors))
+
+    def anchor_view(self, view, attype=None):
+        """Return a dictionary from identifiers to anchors for all annotations of
+        a view, or only for those of the given type."""
+        annotations = view.annotations if attype is None else view.get_annotations(attype)
+        return {anno.id: self.anchor(anno) for anno in annotations}
@@ -0,0 +1,204 @@
+"""boxes.py
+
+Bounding boxes for video frames, created in bulk, and a spatial index on them.
+
+Text detection like EAST runs on sampled frames and often finds the same boxes
+on many frames in a row, for example on a slate that stays on screen for a few
+seconds. The builder takes the boxes of each frame and turns a box that is on
+consecutive frames, no more than one frame step apart, into one BoundingBox
+without a timePoint, aligned to a TimeFrame from the first of those frames up
+to one step after the last one. Run `python -m doctest boxes.py` for a check.
+Boxes that are on only one frame are BoundingBoxes with a timePoint, as before.
+The annotations are created as batches of columns, like in kaldi.py.
+
+BoxIndex answers which boxes contain a point of the image at some time. Boxes
+are put in the cells of a grid over the image that they overlap, and each cell
+keeps the times of its boxes in an IntervalIndex from intervals.py, so a query
+only looks at the boxes in one cell that are shown at that time, and a box that
+is on screen for a long time is still stored once in each cell. As in the
+vocabulary, the start of a TimeFrame is included and the end is not.
+
+"""
+
+from intervals import IntervalIndex
+from utils import type_name
+
+
+BOUNDING_BOX_TYPE = "http://mmif.clams.ai/0.2.0/vocabulary/BoundingBox"
+TIMEFRAME_TYPE = "http://mmif.clams.ai/0.2.0/vocabulary/TimeFrame"
+ALIGNMENT_TYPE = "http://mmif.clams.ai/0.2.0/vocabulary/Alignment"
+
+BATCH_SIZE = 10000
+
+
+def box_key(coordinates):
+    return tuple(tuple(point) for point in coordinates)
+
+
+def frame_step(frames):
+    """Return the smallest distance between the time points of frames."""
+    times = [time_point for time_point, _ in frames]
+    steps = [t2 - t1 for t1, t2 in zip(times, times[1:]) if t2 > t1]
+    return min(steps) if steps else 1
+
+
+def box_runs(frames, step=None):
+    """Generate (coordinates, start, end) for the boxes on frames, which are pairs
+    of a time point and a list of boxes sorted on time point. A box that is on
+    consecutive frames no more than step apart gives one run, with the end step
+    after the last of those frames, where step defaults to the smallest distance
+    between frames. A box that is on only one frame gives a run with None as its
+    end. Runs are generated in the order in which they end. A box seen again
+    after a longer gap starts a new run:
+
+    >>> box = [[0, 0], [10, 0], [0, 5], [10, 5]]
+    >>> frames = [(3000, [box]), (4000, [box]), (5000, [box]), (21000, [box])]
+    >>> [run[1:] for run in box_runs(frames)]
+    [(3000, 6000), (21000, None)]
+
+    """
+    frames = list(frames)
+    if step is None:
+        step = frame_step(frames)
+    # box key -> [coordinates, start, end, number and time point of the last frame with the box]
+    runs = {}
+    for number, (time_point, boxes) in enumerate(frames):
+        for coordinates in boxes:
+            key = box_key(coordinates)
+            run = runs.get(key)
+            if run is not None and run[3] == number:
+                continue
+            if run is not None and run[3] == number - 1 and time_point - run[4] <= step:
+                run[2] = time_point + step
+                run[3] = number
+                run[4] = time_point
+            else:
+                if run is not None:
+                    yield run[0], run[1], run[2]
+                runs[key] = [coordinates, time_point, None, number, time_point]
+        ended = [key for key, run in runs.items() if run[3] < number]
+        for key in ended:
+            run = runs.pop(key)
+            yield run[0], run[1], run[2]
+    for run in runs.values():
+        yield run[0], run[1], run[2]
+
+
+def box_batches(frames, label='text', merge=True, step=None, batch_size=BATCH_SIZE):
+    """Generate the annotations for the boxes on frames as (type, columns) pairs,
+    where columns maps property names to lists of values of the same length.
+    Without merge there is a BoundingBox for each box on each frame."""
+    if merge:
+        runs = box_runs(frames, step)
+    else:
+        runs = ((coordinates, time_point, None) for time_point, boxes in frames for coordinates in boxes)
+    counts = {'bb': 0, 'tf': 0, 'a': 0}
+
+    def ids(prefix, number):
+        first = counts[prefix]
+        counts[prefix] += number
+        return ['%s%d' % (prefix, n) for n in range(first + 1, first + number + 1)]
+
+    batch = []
+    for run in runs:
+        batch.append(run)
+        if len(batch) == batch_size:
+            yield from _batch_columns(batch, label, ids)
+            batch = []
+    if batch:
+        yield from _batch_columns(batch, label, ids)
+
+
+def _batch_columns(batch, label, ids):
+    points = [run for run in batch if run[2] is None]
+    frames = [run for run in batch if run[2] is not None]
+    if points:
+        yield BOUNDING_BOX_TYPE, {
+            'id': ids('bb', len(points)),
+            'timePoint': [start for _, start, _ in points],
+            'coordinates': [coordinates for coordinates, _, _ in points],
+            'label': [label] * len(points)}
+    if frames:
+        frame_ids = ids('tf', len(frames))
+        box_ids = ids('bb', len(frames))
+        yield TIMEFRAME_TYPE, {
+            'id': frame_ids,
+            'start': [start for _, start, _ in frames],
+            'end': [end for _, _, end in frames]}
+        yield BOUNDING_BOX_TYPE, {
+            'id': box_ids,
+            'coordinates': [coordinates for coordinates, _, _ in frames],
+            'label': [label] * len(frames)}
+        yield ALIGNMENT_TYPE, {
+            'id': ids('a', len(frames)),
+            'source': frame_ids,
+            'target': box_ids}
+
+
+class BoxIndex(object):
+
+    """Grid index on boxes that are shown at a time point or during a time frame.
+    The cell size is in pixels."""
+
+    def __init__(self, cell_size=100):
+        self.cell_size = cell_size
+        # cell -> IntervalIndex on the times of (x1, y1, x2, y2, box) entries
+        self.cells = {}
+        self.boxes = 0
+
+    def __len__(self):
+        return self.boxes
+
+    def add(self, box, coordinates, start, end=None):
+        """Add a box, which can be any object, with its coordinates and the time
+        point it is on or the time frame it is shown during."""
+        xs = [point[0] for point in coordinates]
+        ys = [point[1] for point in coordinates]
+        entry = (min(xs), min(ys), max(xs), max(ys), box)
+        size = self.cell_size
+        for cx in range(int(entry[0] // size), int(entry[2] // size) + 1):
+            for cy in range(int(entry[1] // size), int(entry[3] // size) + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is None:
+                    cell = self.cells[(cx, cy)] = IntervalIndex()
+                if end is None:
+                    cell.add_point(start, entry)
+                else:
+                    cell.add_interval(start, end, entry)
+        self.boxes += 1
+
+    def containing(self, x, y, t):
+        """Return the boxes that contain the point (x, y) at time t."""
+        cell = self.cells.get((int(x // self.cell_size), int(y // self.cell_size)))
+        if cell is None:
+            return []
+        return [entry[4] for entry in cell.containing(t) + cell.points_within(t, t)
+                if entry[0] <= x <= entry[2] and entry[1] <= y <= entry[3]]
+
+    @classmethod
+    def from_annotations(cls, annotations, cell_size=100):
+        """Create an index on the BoundingBox annotations in a list of annotation
+        objects, using the TimeFrames aligned to them for the boxes without a
+        timePoint. The boxes in the index are the annotation objects."""
+        index = cls(cell_size)
+        by_id = {}
+        aligned = {}
+        for annotation in annotations:
+            props = annotation['properties']
+            by_id[props['id']] = annotation
+            if type_name(annotation['@type']) == 'Alignment':
+                aligned.setdefault(props['source'], []).append(props['target'])
+                aligned.setdefault(props['target'], []).append(props['source'])
+        for annotation in by_id.values():
+            if type_name(annotation['@type']) != 'BoundingBox':
+                continue
+            props = annotation['properties']
+            if 'timePoint' in props:
+                index.add(annotation, props['coordinates'], props['timePoint'])
+                continue
+            for other_id in aligned.get(props['id'], []):
+                other = by_id.get(other_id)
+                if other is not None and type_name(other['@type']) == 'TimeFrame':
+                    frame = other['properties']
+                    index.add(annotation, props['coordinates'], frame['start'], frame['end'])
+        return index
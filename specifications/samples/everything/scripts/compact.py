@@ -0,0 +1,168 @@
+"""compact.py
+
+Compact storage for the annotations of large views.
+
+Views with hundreds of thousands of tokens, time frames or alignments take a
+lot of memory when every annotation is a dictionary with its own copy of the
+type URI and the property names. AnnotationColumns keeps the annotations of a
+view in columns instead:
+
+- type URIs are stored once per view and annotations refer to them by number
+- the integer properties start, end and timePoint are kept in arrays
+- all other properties are kept in small dictionaries with interned keys, or
+  not at all if an annotation has no other properties
+
+Columns can be filled from the streaming parser so that the full JSON never
+has to be in memory. Run the module as a script to compare the memory used by
+the dictionary-based model in pbcore.py and by the columns for a MMIF file:
+
+    $ python compact.py ../raw.json
+
+"""
+
+import sys
+import json
+import tracemalloc
+from array import array
+
+import mmifstream
+import pbcore
+from utils import type_name
+
+
+NUMERIC_PROPERTIES = ('start', 'end', 'timePoint')
+
+# value in a numeric column for annotations that do not have the property
+MISSING = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+
+def fits_column(value):
+    """Return True if a value can be stored in a numeric column, which excludes
+    integers outside the int64 range and the MISSING marker itself."""
+    return type(value) is int and MISSING < value <= INT64_MAX
+
+
+class AnnotationColumns(object):
+
+    """The annotations of a view, stored column by column. Annotations are
+    referred to by their position in the view."""
+
+    __slots__ = ('view', 'types', 'type_codes', 'ids', 'numeric', 'other', '_codes', '_id_idx')
+
+    def __init__(self, view, annotations=()):
+        self.view = view
+        self.types = []
+        self.type_codes = array('I')
+        self.ids = []
+        self.numeric = {prop: array('q') for prop in NUMERIC_PROPERTIES}
+        self.other = []
+        self._codes = {}
+        self._id_idx = None
+        for anno in annotations:
+            self.append(anno)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def append(self, json_obj):
+        """Add an annotation given as its JSON object."""
+        attype = json_obj['@type']
+        code = self._codes.get(attype)
+        if code is None:
+            code = self._codes[attype] = len(self.types)
+            self.types.append(sys.intern(attype))
+        self.type_codes.append(code)
+        props = json_obj['properties']
+        self.ids.append(props['id'])
+        for prop, column in self.numeric.items():
+            value = props.get(prop)
+            column.append(value if fits_column(value) else MISSING)
+        other = {}
+        for prop, value in props.items():
+            if prop == 'id' or (prop in self.numeric and fits_column(value)):
+                continue
+            other[sys.intern(prop)] = value
+        self.other.append(other or None)
+        self._id_idx = None
+
+    def type(self, i):
+        return self.types[self.type_codes[i]]
+
+    def get_property(self, i, prop):
+        if prop == 'id':
+            return self.ids[i]
+        column = self.numeric.get(prop)
+        if column is not None and column[i] != MISSING:
+            return column[i]
+        other = self.other[i]
+        return other.get(prop) if other else None
+
+    def properties(self, i):
+        props = {'id': self.ids[i]}
+        for prop, column in self.numeric.items():
+            if column[i] != MISSING:
+                props[prop] = column[i]
+        props.update(self.other[i] or {})
+        return props
+
+    def annotation(self, i):
+        """Return the annotation at position i as a pbcore.Annotation."""
+        return pbcore.Annotation(self.view, {'@type': self.type(i), 'properties': self.properties(i)})
+
+    def index(self, anno_id):
+        """Return the position of the annotation with the given identifier, or None."""
+        if self._id_idx is None:
+            self._id_idx = {anno_id: i for i, anno_id in enumerate(self.ids)}
+        return self._id_idx.get(anno_id)
+
+    def positions(self, attype):
+        """Return the positions of the annotations of a type, given as a full URI
+        or as a name."""
+        codes = {code for code, t in enumerate(self.types)
+                 if t == attype or type_name(t) == attype}
+        return [i for i, code in enumerate(self.type_codes) if code in codes]
+
+
+def load_columns(fname, view_ids=None, attypes=None):
+    """Read a MMIF file with the streaming parser and return a dictionary of view
+    identifiers to AnnotationColumns, optionally restricted to some views and
+    annotation types."""
+    columns = {}
+    with open(fname) as fh:
+        for event in mmifstream.iter_events(fh, view_ids, attypes):
+            if event[0] == 'view':
+                view = pbcore.View(None, dict(event[1], annotations=[]))
+                columns[view.id] = AnnotationColumns(view)
+            elif event[0] == 'annotation':
+                columns[event[1]].append(event[2])
+    return columns
+
+
+def measure(fn, *args):
+    """Return the result of fn and the memory it allocated and still holds."""
+    tracemalloc.start()
+    result = fn(*args)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def load_mmif(fname):
+    mmif = pbcore.MMIF(fname)
+    for view in mmif.views:
+        view.annotations
+    return mmif
+
+
+if __name__ == '__main__':
+
+    infile = sys.argv[1]
+    mmif, json_size = measure(lambda: json.load(open(infile)))
+    count = sum(len(view['annotations']) for view in mmif['views'])
+    del mmif
+    _, dict_size = measure(load_mmif, infile)
+    _, columns_size = measure(load_columns, infile)
+    print('%d annotations' % count)
+    for name, size in (('json', json_size), ('pbcore.MMIF', dict_size), ('AnnotationColumns', columns_size)):
+        print('%-20s %12d bytes %8.1f bytes/annotation' % (name, size, size / max(count, 1)))
@@ -1,10 +1,15 @@
 """east.py
 
 Utility script to create the bounding boxes of the EAST view in the example.
+With --merge, boxes that are the same on consecutive frames are created once,
+aligned to a time frame, see boxes.py.
 
 """
 
-from utils import print_annotation
+import sys
+
+from boxes import box_batches
+from utils import AnnotationWriter
 
 
 slate_box_coordinates = [
@@ -25,29 +30,17 @@ slate_box_coordinates = [
 
 fido_box_coordinates = [[150, 810], [1120, 810], [150, 870], [1120, 870]]
 
+frames = [
+    (3000, slate_box_coordinates),
+    (4000, slate_box_coordinates),
+    (5000, slate_box_coordinates),
+    (21000, [fido_box_coordinates])]
 
-    
-    
 
 if __name__ == '__main__':
 
-    count = 0
-    for time_offset in 3000, 4000, 5000:
-        for coordinates in slate_box_coordinates:
-            count += 1
-            box_id = 'bb%s' % count
-            print_annotation(
-                "http://mmif.clams.ai/0.2.0/vocabulary/BoundingBox",
-                [('id', box_id),
-                 ('timePoint', time_offset),
-                 ('coordinates', coordinates),
-                 ('label', 'text')])
-
-    count += 1
-    box_id = 'bb%s' % count
-    print_annotation(
-        "http://mmif.clams.ai/0.2.0/vocabulary/BoundingBox",
-        [('id', box_id),
-         ('timePoint', 21000),
-         ('coordinates', fido_box_coordinates),
-         ('label', 'text')])
+    # the example has a box for each frame, use --merge for boxes over time frames
+    merge = '--merge' in sys.argv[1:]
+    with AnnotationWriter() as writer:
+        for attype, columns in box_batches(frames, merge=merge, step=1000):
+            writer.write_columns(attype, columns)
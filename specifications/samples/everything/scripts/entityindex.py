@@ -0,0 +1,296 @@
+"""entityindex.py
+
+Persistent index on the named entities in a collection of MMIF files, to find
+all occurrences of an entity across an archive without reading the files again.
+
+The index is a SQLite database. Entities are stored once for each distinct file
+content, keyed on the SHA-1 digest of the file, and a separate table maps file
+paths to digests. Ingesting a collection again only reads files whose size or
+modification time changed, and of those only files with a digest that is not
+in the index yet are parsed, so renamed and copied files cost one digest. The
+entities of contents that no file refers to any more are removed.
+
+For each entity the text offsets are stored, as well as the anchor in media
+time found through the alignment graph, in milliseconds, so that entities can
+be looked up on text, category and time:
+
+    $ python entityindex.py entities.db ingest -j 4 /data/mmif/
+    $ python entityindex.py entities.db find --text "Jim Lehrer" --category Person
+    $ python entityindex.py entities.db time 0 10000
+
+"""
+
+import os
+import sys
+import sqlite3
+import hashlib
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import pbcore
+from utils import type_name
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS files_digest ON files (digest);
+CREATE TABLE IF NOT EXISTS contents (
+    digest TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS entities (
+    digest TEXT NOT NULL REFERENCES contents (digest) ON DELETE CASCADE,
+    view TEXT,
+    annotation TEXT,
+    category TEXT,
+    text TEXT,
+    document TEXT,
+    start INTEGER,
+    end INTEGER,
+    media_document TEXT,
+    media_start INTEGER,
+    media_end INTEGER);
+CREATE INDEX IF NOT EXISTS entities_text ON entities (text, category);
+CREATE INDEX IF NOT EXISTS entities_category ON entities (category);
+CREATE INDEX IF NOT EXISTS entities_time ON entities (media_start, media_end);
+CREATE INDEX IF NOT EXISTS entities_digest ON entities (digest);
+"""
+
+ENTITY_COLUMNS = ('view', 'annotation', 'category', 'text', 'document', 'start', 'end',
+                  'media_document', 'media_start', 'media_end')
+
+Occurrence = namedtuple('Occurrence', ('path',) + ENTITY_COLUMNS)
+
+MMIF_EXTENSIONS = ('.json', '.mmif')
+
+# factors to turn time offsets into milliseconds, anchors in other units are not stored
+MILLISECONDS = {'milliseconds': 1, 'seconds': 1000}
+
+
+def file_digest(fname):
+    """Return a hex digest of the contents of a file."""
+    h = hashlib.sha1()
+    with open(fname, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def extract_entities(fname):
+    """Return a list of rows with the values of ENTITY_COLUMNS for the named
+    entities in a MMIF file."""
+    mmif = pbcore.MMIF(fname)
+    graph = None
+    rows = []
+    for view in mmif.views:
+        contains = view.metadata.get('contains', {})
+        if not any(type_name(attype) == pbcore.ENTITY_TYPE for attype in contains):
+            continue
+        if graph is None:
+            graph = mmif.get_alignment_graph()
+        for anno in view.get_annotations(pbcore.ENTITY_TYPE):
+            anchor = graph.anchor(anno)
+            factor = None if anchor is None else MILLISECONDS.get(anchor.unit)
+            if factor is None:
+                media = (None, None, None)
+            else:
+                media = (anchor.document, round(anchor.start * factor), round(anchor.end * factor))
+            rows.append((view.id, anno.id, anno.get_property('category'), anno.get_property('text'),
+                         view.get_document(anno), anno.get_property('start'), anno.get_property('end'))
+                        + media)
+    return rows
+
+
+def find_mmif_files(paths):
+    """Return the files and the MMIF files in the directories in paths."""
+    found = []
+    for path in paths:
+        if not os.path.isdir(path):
+            found.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            found.extend(os.path.join(root, fname) for fname in sorted(files)
+                         if fname.endswith(MMIF_EXTENSIONS))
+    return found
+
+
+def _digest_and_extract(job):
+    path, known = job
+    try:
+        digest = file_digest(path)
+    except OSError as e:
+        # the file went away or cannot be read since it was found
+        return None, '%s: %s' % (type(e).__name__, e)
+    if digest in known:
+        return digest, None
+    try:
+        return digest, extract_entities(path)
+    except Exception as e:
+        # any malformed file is reported, one file does not stop the ingest
+        return digest, '%s: %s' % (type(e).__name__, e)
+
+
+class EntityIndex(object):
+
+    """SQLite index on the named entities in MMIF files."""
+
+    def __init__(self, fname):
+        self.connection = sqlite3.connect(fname)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def ingest(self, paths, jobs=1):
+        """Add MMIF files, and the MMIF files in directories, to the index, if they
+        are new or changed. Returns a dictionary with the number of files that
+        were unchanged, that were parsed, that only needed their digest and that
+        failed, with the error messages for the latter under 'errors'."""
+        stats = {'unchanged': 0, 'parsed': 0, 'known': 0, 'failed': 0, 'errors': []}
+        recorded = {path: (size, mtime) for path, size, mtime
+                    in self.connection.execute('SELECT path, size, mtime FROM files')}
+        changed = []
+        for path in find_mmif_files(paths):
+            path = os.path.abspath(path)
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                # the file went away since it was found, --prune removes it from the index
+                stats['failed'] += 1
+                stats['errors'].append((path, '%s: %s' % (type(e).__name__, e)))
+                continue
+            if recorded.get(path) == (stat.st_size, stat.st_mtime):
+                stats['unchanged'] += 1
+            else:
+                changed.append((path, stat))
+        known = {digest for digest, in self.connection.execute('SELECT digest FROM contents')}
+        job_list = [(path, known) for path, _ in changed]
+        if jobs > 1 and len(job_list) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = executor.map(_digest_and_extract, job_list, chunksize=max(1, len(job_list) // (jobs * 4)))
+                self._store(changed, results, known, stats)
+        else:
+            self._store(changed, map(_digest_and_extract, job_list), known, stats)
+        return stats
+
+    def _store(self, changed, results, known, stats):
+        with self.connection:
+            for (path, stat), (digest, result) in zip(changed, results):
+                if type(result) is str:
+                    stats['failed'] += 1
+                    stats['errors'].append((path, result))
+                    # the entities of the old contents do not belong to this path any more
+                    self.connection.execute('DELETE FROM files WHERE path = ?', (path,))
+                    continue
+                if result is None or digest in known:
+                    stats['known'] += 1
+                else:
+                    self.connection.execute('INSERT INTO contents VALUES (?)', (digest,))
+                    self.connection.executemany(
+                        'INSERT INTO entities VALUES (?, %s)' % ', '.join('?' * len(ENTITY_COLUMNS)),
+                        [(digest,) + row for row in result])
+                    known.add(digest)
+                    stats['parsed'] += 1
+                self.connection.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)',
+                                        (path, digest, stat.st_size, stat.st_mtime))
+            self._remove_orphans()
+
+    def remove_missing(self):
+        """Remove files that do not exist any more from the index and return their
+        number."""
+        missing = [(path,) for path, in self.connection.execute('SELECT path FROM files')
+                   if not os.path.exists(path)]
+        with self.connection:
+            self.connection.executemany('DELETE FROM files WHERE path = ?', missing)
+            self._remove_orphans()
+        return len(missing)
+
+    def _remove_orphans(self):
+        self.connection.execute('DELETE FROM contents WHERE digest NOT IN (SELECT digest FROM files)')
+
+    def _occurrences(self, condition, parameters):
+        query = ('SELECT files.path, %s FROM entities JOIN files ON entities.digest = files.digest WHERE %s '
+                 'ORDER BY files.path, media_start' % (', '.join('entities.%s' % c for c in ENTITY_COLUMNS), condition))
+        return [Occurrence(*row) for row in self.connection.execute(query, parameters)]
+
+    def find(self, text=None, category=None):
+        """Return the occurrences of entities with the given text and/or category,
+        in all files with the same contents."""
+        conditions = []
+        parameters = []
+        if text is not None:
+            conditions.append('entities.text = ?')
+            parameters.append(text)
+        if category is not None:
+            conditions.append('entities.category = ?')
+            parameters.append(category)
+        return self._occurrences(' AND '.join(conditions) or '1', parameters)
+
+    def at_time(self, start, end, category=None):
+        """Return the occurrences of entities anchored in media time between start
+        and end in milliseconds, with the start included and the end not. Entities
+        anchored to a time point are included if that point is in the range."""
+        condition = ('media_start < ? AND (media_end > ? OR (media_start = media_end AND media_start >= ?))')
+        parameters = [end, start, start]
+        if category is not None:
+            condition += ' AND entities.category = ?'
+            parameters.append(category)
+        return self._occurrences(condition, parameters)
+
+    def categories(self):
+        """Return pairs of category and number of occurrences over all files."""
+        return list(self.connection.execute(
+            'SELECT category, COUNT(*) FROM entities JOIN files ON entities.digest = files.digest '
+            'GROUP BY category ORDER BY category'))
+
+
+def print_occurrences(occurrences):
+    for occ in occurrences:
+        anchor = '' if occ.media_start is None else '%s %d-%d' % (occ.media_document, occ.media_start, occ.media_end)
+        print('%-14s %-20s %-20s %s' % (occ.category, occ.text, anchor, occ.path))
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Index the named entities in MMIF files.')
+    parser.add_argument('database', help='SQLite file with the index')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparser = subparsers.add_parser('ingest', help='add new and changed MMIF files')
+    subparser.add_argument('paths', nargs='+', help='MMIF files or directories with MMIF files')
+    subparser.add_argument('-j', '--jobs', type=int, default=1, help='number of files to read in parallel')
+    subparser.add_argument('--prune', action='store_true', help='remove files that do not exist any more')
+    subparser = subparsers.add_parser('find', help='find entities on text and category')
+    subparser.add_argument('--text')
+    subparser.add_argument('--category')
+    subparser = subparsers.add_parser('time', help='find entities anchored between two times in milliseconds')
+    subparser.add_argument('start', type=int)
+    subparser.add_argument('end', type=int)
+    subparser.add_argument('--category')
+    subparsers.add_parser('categories', help='count the entities in each category')
+    args = parser.parse_args()
+    with EntityIndex(args.database) as index:
+        if args.command == 'ingest':
+            if args.prune:
+                print('removed %d missing files' % index.remove_missing())
+            stats = index.ingest(args.paths, args.jobs)
+            print('parsed %(parsed)d, already known %(known)d, unchanged %(unchanged)d, failed %(failed)d' % stats)
+            for path, error in stats['errors']:
+                print('    %s: %s' % (path, error))
+        elif args.command == 'find':
+            print_occurrences(index.find(args.text, args.category))
+        elif args.command == 'time':
+            print_occurrences(index.at_time(args.start, args.end, args.category))
+        else:
+            for category, count in index.categories():
+                print('%-14s %d' % (category, count))
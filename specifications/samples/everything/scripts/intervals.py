@@ -0,0 +1,205 @@
+"""intervals.py
+
+Indexes on the anchors of annotations, to find what was said or shown in some
+stretch of a document without scanning all views.
+
+Annotations are anchored with start and end properties (Interval, TimeFrame,
+Span and their subtypes like Token and NamedEntity) or with a timePoint
+property (TimePoint, BoundingBox). Each document and unit gets its own
+IntervalIndex, where intervals are kept sorted on their start in an implicit
+binary tree that also holds the largest end offset in each subtree, and points
+are kept in a sorted list. Overlap and containment queries only visit the
+subtrees that can hold results, which for typical annotations comes down to
+O(log n + k) time for k results, and point queries take O(log n) time.
+
+As in the vocabulary, the start of an interval is included and the end is not.
+Time offsets are in the unit given by the timeUnit metadata, which defaults to
+milliseconds, and text offsets are in characters.
+
+"""
+
+from bisect import bisect_left, bisect_right
+
+from utils import type_name
+
+
+def is_number(value):
+    return type(value) in (int, float)
+
+
+class IntervalIndex(object):
+
+    """Index on the intervals and points of the annotations for one document in
+    one unit. The index is built when it is first queried."""
+
+    def __init__(self):
+        self._intervals = []
+        self._points = []
+        self._built = False
+
+    def __len__(self):
+        return len(self._intervals) + len(self._points)
+
+    def add_interval(self, start, end, annotation):
+        self._intervals.append((start, end, annotation))
+        self._built = False
+
+    def add_point(self, point, annotation):
+        self._points.append((point, annotation))
+        self._built = False
+
+    def _build(self):
+        self._intervals.sort(key=lambda interval: interval[:2])
+        self.starts = [interval[0] for interval in self._intervals]
+        self.ends = [interval[1] for interval in self._intervals]
+        self.max_ends = self.ends[:]
+        self._fill_max_ends(0, len(self.ends))
+        self._points.sort(key=lambda point: point[0])
+        self.points = [point[0] for point in self._points]
+        self._built = True
+
+    def _fill_max_ends(self, lo, hi):
+        # the node for [lo, hi) is at the middle, its children cover the halves
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        for child in (self._fill_max_ends(lo, mid), self._fill_max_ends(mid + 1, hi)):
+            if child is not None and child > self.max_ends[mid]:
+                self.max_ends[mid] = child
+        return self.max_ends[mid]
+
+    def _search(self, start_ok, end_ok):
+        """Return the annotations of all intervals whose start and end satisfy
+        the given tests, in order of their start. Both tests must be monotonic:
+        start_ok holds up to some start and end_ok holds from some end on."""
+        if not self._built:
+            self._build()
+        found = []
+        stack = [(0, len(self.starts))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if not end_ok(self.max_ends[mid]):
+                continue
+            stack.append((lo, mid))
+            if start_ok(self.starts[mid]):
+                if end_ok(self.ends[mid]):
+                    found.append(mid)
+                stack.append((mid + 1, hi))
+        return [self._intervals[i][2] for i in sorted(found)]
+
+    def overlapping(self, start, end):
+        """Return the annotations of intervals that overlap with start-end."""
+        if start == end:
+            return self.containing(start)
+        return self._search(lambda s: s < end, lambda e: e > start)
+
+    def containing(self, start, end=None):
+        """Return the annotations of intervals that contain start-end, or that
+        contain the point start if no end is given."""
+        if end is None:
+            return self._search(lambda s: s <= start, lambda e: e > start)
+        return self._search(lambda s: s <= start, lambda e: e >= end)
+
+    def within(self, start, end):
+        """Return the annotations of intervals that lie within start-end."""
+        if not self._built:
+            self._build()
+        first = bisect_left(self.starts, start)
+        last = bisect_right(self.starts, end)
+        return [self._intervals[i][2] for i in range(first, last) if self.ends[i] <= end]
+
+    def points_within(self, start, end):
+        """Return the annotations of points from start to end."""
+        if not self._built:
+            self._build()
+        first = bisect_left(self.points, start)
+        last = bisect_right(self.points, end)
+        return [point[1] for point in self._points[first:last]]
+
+    def nearest_point(self, point):
+        """Return the annotation of the point closest to the given point, or None
+        if there are no points. Ties go to the earlier point."""
+        if not self._built:
+            self._build()
+        i = bisect_left(self.points, point)
+        candidates = [j for j in (i - 1, i) if 0 <= j < len(self.points)]
+        if not candidates:
+            return None
+        best = min(candidates, key=lambda j: abs(self.points[j] - point))
+        return self._points[best][1]
+
+
+class AnchorIndex(object):
+
+    """All interval indexes of a MMIF file, one for each combination of document
+    and unit. Offsets into text documents are in characters, the unit of other
+    offsets comes from the timeUnit property of the annotation or from the view
+    metadata."""
+
+    def __init__(self, views=(), documents=()):
+        self.indexes = {}
+        # text documents can be top-level documents or annotations in a view
+        self.text_documents = {doc['properties']['id'] for doc in documents
+                               if type_name(doc['@type']) == 'TextDocument'}
+        for view in views:
+            self.add_view(view)
+
+    def add_view(self, view):
+        for anno in view.annotations:
+            if type_name(anno.type) == 'TextDocument':
+                self.text_documents.add(anno.id)
+        for anno in view.annotations:
+            self.add_annotation(view, anno)
+
+    def add_annotation(self, view, anno):
+        start = anno.get_property('start')
+        end = anno.get_property('end')
+        point = anno.get_property('timePoint')
+        if is_number(start) and is_number(end):
+            self._get_or_add(view, anno).add_interval(start, end, anno)
+        elif is_number(point):
+            self._get_or_add(view, anno).add_point(point, anno)
+
+    def _get_or_add(self, view, anno):
+        return self.indexes.setdefault(self.document_and_unit(view, anno), IntervalIndex())
+
+    def document_and_unit(self, view, anno):
+        """Return the document that the offsets of an annotation refer to and the
+        unit of those offsets."""
+        contains = view.metadata.get('contains', {}).get(anno.type, {})
+        document = anno.get_property('document') or contains.get('document')
+        if document in self.text_documents:
+            return document, 'characters'
+        return document, anno.get_property('timeUnit') or contains.get('timeUnit') or 'milliseconds'
+
+    def units(self, document):
+        return [unit for doc, unit in self.indexes if doc == document]
+
+    def get(self, document, unit=None):
+        """Return the index for a document and unit. The unit can be left out if
+        the document has annotations in only one unit."""
+        if unit is None:
+            units = self.units(document)
+            if len(units) > 1:
+                raise ValueError('document %s has annotations in several units: %s'
+                                 % (document, ', '.join(str(unit) for unit in units)))
+            unit = units[0] if units else None
+        return self.indexes.get((document, unit), IntervalIndex())
+
+    def overlapping(self, document, start, end, unit=None):
+        return self.get(document, unit).overlapping(start, end)
+
+    def containing(self, document, start, end=None, unit=None):
+        return self.get(document, unit).containing(start, end)
+
+    def within(self, document, start, end, unit=None):
+        return self.get(document, unit).within(start, end)
+
+    def points_within(self, document, start, end, unit=None):
+        return self.get(document, unit).points_within(start, end)
+
+    def nearest_point(self, document, point, unit=None):
+        return self.get(document, unit).nearest_point(point)
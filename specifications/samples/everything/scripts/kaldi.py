@@ -3,51 +3,105 @@
 Utility script to create the tokens, time frames and alignments of the Kaldi
 view in the example.
 
+Tokens are found with one regular expression over the whole transcript and
+their offsets are kept in arrays. Times are computed from anchor points, which
+are pairs of a text offset and a time in milliseconds as given by the
+recognizer. Between two anchors times are interpolated linearly and rounded to
+the nearest millisecond, so the time of a token only depends on the anchors
+around it. Offsets outside the anchors continue the first or last stretch. The
+example was created with each character taking a whole number of milliseconds,
+rounded down, and the script keeps doing that with legacy=True so that its
+output stays the same as the view in raw.json. The annotations are created in batches of columns, with for each batch the tokens,
+time frames and alignments, which keeps memory bounded for long transcripts.
+
 """
 
-from utils import print_annotation
+import re
+from array import array
+from bisect import bisect_right
+
+from utils import AnnotationWriter
+
+
+TEXT = "Hello, this is Jim Lehrer with the NewsHour on PBS. In the nineteen eighties, barking dogs have increasingly become a problem in urban areas."
+
+TOKEN_TYPE = "http://vocab.lappsgrid.org/Token"
+TIMEFRAME_TYPE = "http://mmif.clams.ai/0.2.0/vocabulary/TimeFrame"
+ALIGNMENT_TYPE = "http://mmif.clams.ai/0.2.0/vocabulary/Alignment"
+
+# Text offsets with their time offsets, the example only has the start and end
+ANCHORS = [(0, 5500), (141, 22000)]
+
+TOKEN = re.compile(r"\w+|[^\w\s]")
+
+BATCH_SIZE = 10000
 
 
-TOKENS = "Hello, this is Jim Lehrer with the NewsHour on PBS. In the nineteen eighties, barking dogs have increasingly become a problem in urban areas.".split()
+def tokenize(text):
+    """Return arrays with the start and end offsets of the tokens in the text."""
+    starts = array('l')
+    ends = array('l')
+    for match in TOKEN.finditer(text):
+        starts.append(match.start())
+        ends.append(match.end())
+    return starts, ends
 
 
-# Calculating time offsets from text offsets
-FIRST_TEXT_OFFSET = 0
-LAST_TEXT_OFFSET = 141
-FIRST_TIME_OFFSET = 5500
-LAST_TIME_OFFSET = 22000
-STEP = int((LAST_TIME_OFFSET - FIRST_TIME_OFFSET) / LAST_TEXT_OFFSET)
+def interpolate(offsets, anchors, legacy=False):
+    """Return a list with the times of the text offsets, with the anchors given
+    as (offset, time) pairs sorted on offset. With legacy each character between
+    two anchors takes the same number of milliseconds, rounded down, as in the
+    example."""
+    xs = [offset for offset, _ in anchors]
+    last = len(anchors) - 2
+    times = []
+    if legacy:
+        # milliseconds per character for each stretch between two anchors
+        steps = [int((t2 - t1) / (x2 - x1)) for (x1, t1), (x2, t2) in zip(anchors, anchors[1:])]
+        for offset in offsets:
+            i = min(max(bisect_right(xs, offset) - 1, 0), last)
+            times.append(anchors[i][1] + (offset - xs[i]) * steps[i])
+        return times
+    for offset in offsets:
+        i = min(max(bisect_right(xs, offset) - 1, 0), last)
+        (x1, t1), (x2, t2) = anchors[i], anchors[i + 1]
+        times.append(t1 + round((offset - x1) * (t2 - t1) / (x2 - x1)))
+    return times
 
 
-def gather_annotations():
-    offset = 0
-    token_annotations = []
-    for token in TOKENS:
-        if token[-1] in ',.':
-            token_annotations.append((offset, offset + len(token) - 1, token[:-1]))
-            token_annotations.append((offset + len(token) - 1, offset + len(token), token[-1]))
-        else:
-            token_annotations.append((offset, offset + len(token), token))
-        offset += len(token) + 1
-    return token_annotations
+def alignment_batches(text, anchors=ANCHORS, batch_size=BATCH_SIZE, legacy=False):
+    """Generate the annotations for a transcript in batches, each a list of
+    (type, columns) pairs for the tokens, time frames and alignments, where
+    columns maps property names to lists of values of the same length. See
+    interpolate() for legacy."""
+    starts, ends = tokenize(text)
+    anchors = sorted(anchors)
+    for first in range(0, len(starts), batch_size):
+        batch_starts = starts[first:first + batch_size]
+        batch_ends = ends[first:first + batch_size]
+        numbers = range(first + 1, first + len(batch_starts) + 1)
+        token_ids = ['t%d' % n for n in numbers]
+        frame_ids = ['tf%d' % n for n in numbers]
+        tokens = {
+            'id': token_ids,
+            'start': batch_starts.tolist(),
+            'end': batch_ends.tolist(),
+            'text': [text[p1:p2] for p1, p2 in zip(batch_starts, batch_ends)]}
+        frames = {
+            'id': frame_ids,
+            'start': interpolate(batch_starts, anchors, legacy),
+            'end': interpolate(batch_ends, anchors, legacy)}
+        alignments = {
+            'id': ['a%d' % (n + 1) for n in numbers],
+            'source': frame_ids,
+            'target': token_ids}
+        yield [(TOKEN_TYPE, tokens), (TIMEFRAME_TYPE, frames), (ALIGNMENT_TYPE, alignments)]
 
 
 if __name__ == '__main__':
 
-    count = 0
-    for p1, p2, token in gather_annotations():
-        count += 1
-        token_id = 't%s' % count
-        frame_id = 'tf%s' % count
-        align_id = 'a%s' % (count + 1)
-        frame_p1 = FIRST_TIME_OFFSET + p1 * STEP
-        frame_p2 = FIRST_TIME_OFFSET + p2 * STEP
-        print_annotation(
-            "http://vocab.lappsgrid.org/Token",
-            [('id', token_id), ('start', p1), ('end', p2), ('text', token)])
-        print_annotation(
-            "http://mmif.clams.ai/0.2.0/vocabulary/TimeFrame",
-            [('id', frame_id), ('start', frame_p1), ('end', frame_p2)])
-        print_annotation(
-            "http://mmif.clams.ai/0.2.0/vocabulary/Alignment",
-            [('id', align_id), ('source', frame_id), ('target', token_id)])
+    with AnnotationWriter() as writer:
+        # the legacy times reproduce the Kaldi view in raw.json
+        for batch in alignment_batches(TEXT, legacy=True):
+            # a token, its time frame and their alignment in turn, as in raw.json
+            writer.write_interleaved(batch)
@@ -0,0 +1,78 @@
+"""mmifstream.py
+
+Incremental parser for MMIF files that are too large to load in one go.
+
+The file is read in chunks and only one annotation at a time is decoded, so
+memory use does not depend on the size of the file. The parser yields events:
+
+    ('metadata', dict)                   the top-level metadata
+    ('document', dict)                   each top-level document
+    ('view', dict)                       view identifier and metadata
+    ('annotation', view_id, dict)        each annotation of the view
+    ('end_view', view_id)                after the last annotation of the view
+
+Views can be filtered on their identifier and annotations on their @type,
+given as full URIs or as type names. Views and annotations that are filtered
+out are still read but skipped right away.
+
+Views normally have their identifier and metadata before their annotations. If
+a view lists its annotations first they have to be kept in memory until the
+rest of the view is read.
+
+"""
+
+import os
+import sys
+
+from utils import type_name
+
+# the JSON scanner lives with the schema tools, which use it as well
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), *[os.pardir] * 4, 'schema'))
+from jsonscanner import JSONScanner
+
+
+def type_matches(attype, attypes):
+    return attypes is None or attype in attypes or type_name(attype) in attypes
+
+
+def iter_events(fh, view_ids=None, attypes=None, chunk_size=1 << 16):
+    """Generate parse events for the MMIF file opened as fh, only for views in
+    view_ids and for annotations with a @type in attypes (if given)."""
+    scanner = JSONScanner(fh, chunk_size)
+    for key in scanner.members():
+        if key == 'views':
+            for _ in scanner.elements():
+                yield from _view_events(scanner, view_ids, attypes)
+        elif key == 'documents':
+            for _ in scanner.elements():
+                yield 'document', scanner.value()
+        else:
+            yield key, scanner.value()
+
+
+def _view_events(scanner, view_ids, attypes):
+    header = {}
+    pending = None
+    started = False
+    for key in scanner.members():
+        if key != 'annotations':
+            header[key] = scanner.value()
+        elif 'id' not in header or 'metadata' not in header:
+            pending = [anno for anno in scanner.value() if type_matches(anno.get('@type', ''), attypes)]
+        else:
+            wanted = view_ids is None or header['id'] in view_ids
+            if wanted:
+                started = True
+                yield 'view', header
+            for _ in scanner.elements():
+                anno = scanner.value()
+                if wanted and type_matches(anno.get('@type', ''), attypes):
+                    yield 'annotation', header['id'], anno
+    header.setdefault('metadata', {})
+    if view_ids is not None and header.get('id') not in view_ids:
+        return
+    if not started:
+        yield 'view', header
+    for anno in pending or []:
+        yield 'annotation', header['id'], anno
+    yield 'end_view', header['id']
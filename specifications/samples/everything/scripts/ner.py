@@ -14,7 +14,7 @@ New York	v7  ne10 v6:td25:7-16
 		v5  bb25 timePoint: 21000
 """
 
-from utils import print_annotation
+from utils import AnnotationWriter
 
 
 # Entities from the text documents, again some repetition.
@@ -35,24 +35,25 @@ entities = [
 
 if __name__ == '__main__':
 
-    count = 0
-    for entity in entities:
-        count += 1
-        ner_id = 'ne%s' % count
-        text = entity[0]
-        cat = entity[1]
-        document = entity[2]
-        if len(entity) == 5:
-            start = entity[3]
-            end = entity[4]
-        else:
-            start = 0
-            end = len(text)
-        print_annotation(
-            "http://vocab.lappsgrid.org/NamedEntity",
-            [('id', ner_id),
-             ('document', document),
-             ('start', start),
-             ('end', end),
-             ('category', cat),
-             ('text', text)])
+    with AnnotationWriter() as writer:
+        count = 0
+        for entity in entities:
+            count += 1
+            ner_id = 'ne%s' % count
+            text = entity[0]
+            cat = entity[1]
+            document = entity[2]
+            if len(entity) == 5:
+                start = entity[3]
+                end = entity[4]
+            else:
+                start = 0
+                end = len(text)
+            writer.write(
+                "http://vocab.lappsgrid.org/NamedEntity",
+                [('id', ner_id),
+                 ('document', document),
+                 ('start', start),
+                 ('end', end),
+                 ('category', cat),
+                 ('text', text)])
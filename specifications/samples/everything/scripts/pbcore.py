@@ -4,36 +4,86 @@ Script to experiment with exporting information from a MMIF file into PBCore.
 
 See ../pbcore.md for a description.
 
+To export PBCore for whole directories of MMIF files use pbcore_export.py.
+
 """
 
 import sys
 import json
 
+import alignments
+import intervals
+import mmifstream
+from utils import type_name
+
 
 CONTRIBUTOR_TYPES = ('Host', 'Producer')
 TITLE_TYPE = 'Title'
 DATE_TYPE = 'Date'
 
-TAG_TYPE = 'http://vocab.lappsgrid.org/SemanticTag'
+# Types are given by name, which matches all versions of the type no matter
+# whether it comes from the CLAMS or the LAPPS vocabulary.
+TAG_TYPE = 'SemanticTag'
 
-ENTITY_TYPE = 'http://vocab.lappsgrid.org/NamedEntity'
+ENTITY_TYPE = 'NamedEntity'
 ENTITY_CATEGORY = 'Person'
 
 
 class MMIF(object):
 
-    """Simplistic MMIF class, will be deprecated when the MMIF SDK is stable."""
+    """Simplistic MMIF class, will be deprecated when the MMIF SDK is stable.
+
+    Views are indexed on their identifiers. Annotations are only turned into
+    Annotation objects and indexed when a view is first asked for them."""
     
     def __init__(self, fname):
-        self.json = json.load(open(infile))
+        self.json = json.load(open(fname))
         self.metadata = self.json['metadata']
         self.documents = self.json['documents']
         self.views = [View(self, view) for view in self.json['views']]
+        self._views_idx = {view.id: view for view in self.views}
+        self._documents_idx = None
+        self._anchor_idx = None
+        self._alignment_graph = None
 
     def get_view(self, view_id):
-        for view in self.views:
-            if view.id == view_id:
-                return view
+        return self._views_idx.get(view_id)
+
+    def get_document(self, doc_id):
+        """Return the JSON object of a top-level document."""
+        if self._documents_idx is None:
+            self._documents_idx = {doc['properties']['id']: doc for doc in self.documents}
+        return self._documents_idx.get(doc_id)
+
+    def get_anchor_index(self):
+        """Return the intervals.AnchorIndex over all views, to find annotations
+        by their time or text offsets."""
+        if self._anchor_idx is None:
+            self._anchor_idx = intervals.AnchorIndex(self.views, self.documents)
+        return self._anchor_idx
+
+    def get_alignment_graph(self):
+        """Return the alignments.AlignmentGraph, to anchor annotations to times
+        in the media."""
+        if self._alignment_graph is None:
+            self._alignment_graph = alignments.AlignmentGraph(self)
+        return self._alignment_graph
+
+    def get_annotation(self, long_id, view=None):
+        """Return the annotation for an identifier. This can be a long identifier
+        like "v5:bb25", or a short one like "bb25" that is looked up in the given
+        view. Since MMIF 1.0 identifiers of annotations include the view prefix,
+        both forms are tried."""
+        if view is not None:
+            anno = view.get_annotation(long_id) or view.get_annotation(f'{view.id}:{long_id}')
+            if anno is not None:
+                return anno
+        view_id, sep, short_id = long_id.partition(':')
+        if sep:
+            view = self.get_view(view_id)
+            if view is not None:
+                return view.get_annotation(long_id) or view.get_annotation(short_id)
+        return None
     
 
 class View(object):
@@ -42,52 +92,70 @@ class View(object):
         self.mmif = mmif
         self.id = json_obj['id']
         self.metadata = json_obj['metadata']
-        self.annotations = [Annotation(self, anno) for anno in json_obj['annotations']]
+        self._annotations_json = json_obj['annotations']
+        self._annotations = None
+        self._id_idx = None
+        self._type_idx = None
+        self._type_name_idx = None
+        self._entities = None
 
     def __str__(self):
         return "<View %s %s>" % (self.id, self.metadata['app'])
 
+    @property
+    def annotations(self):
+        if self._annotations is None:
+            self._annotations = [Annotation(self, anno) for anno in self._annotations_json]
+        return self._annotations
+
+    def get_annotation(self, anno_id):
+        """Return the annotation with the given identifier, or None."""
+        if self._id_idx is None:
+            self._id_idx = {anno.id: anno for anno in self.annotations}
+        return self._id_idx.get(anno_id)
+
+    def get_annotations(self, attype):
+        """Return all annotations of a type, given as a full URI or as a name."""
+        if self._type_idx is None:
+            self._type_idx = {}
+            self._type_name_idx = {}
+            for anno in self.annotations:
+                self._type_idx.setdefault(anno.type, []).append(anno)
+                self._type_name_idx.setdefault(type_name(anno.type), []).append(anno)
+        if '/' in attype:
+            return self._type_idx.get(attype, [])
+        return self._type_name_idx.get(attype, [])
+
     def get_document(self, annotation):
         return (
             annotation.get_property('document')
-            or self.metatdata['contains'][annotation.type]['document'])
+            or self.metadata['contains'][annotation.type]['document'])
 
     def get_entities(self):
-        entities = {}
-        for anno in self.annotations:
-            if anno.type == ENTITY_TYPE:
-                entity = anno.get_property('text')
-                cat = anno.get_property('category')
-                doc = self.get_document(anno)
-                p1 = anno.get_property('start')
-                p2 = anno.get_property('end')
-                entities.setdefault(cat, {})
-                entities[cat].setdefault(entity, []).append((entity, doc, p1, p2, anno, anno))
-        return entities
+        """Return the named entities grouped on category and text, collected the
+        first time they are asked for. For entities across many files see
+        entityindex.py."""
+        if self._entities is None:
+            self._entities = collect_entities(self, self.get_annotations(ENTITY_TYPE))
+        return self._entities
 
     def get_persons(self):
-        persons = []
-        for anno in self.annotations:
-            if (anno.type == ENTITY_TYPE
-                and anno.get_property('category') == ENTITY_CATEGORY):
-                persons.append(anno)
-        return persons
+        return collect_persons(self.get_annotations(ENTITY_TYPE))
 
     def get_contributors(self):
         """Pull all contributors from the slate parser view."""
-        contributors = {}
-        for anno in self.annotations:
-            tagname = anno.get_property('tagName')
-            if anno.type == TAG_TYPE and tagname in CONTRIBUTOR_TYPES:
-                contributors.setdefault(tagname, set()).add(anno.get_property('text'))
-        return contributors
+        return collect_contributors(self.get_annotations(TAG_TYPE))
 
 
 class Annotation(object):
 
+    # there can be very many annotations, so no per-instance dictionary, and all
+    # annotations of a type share the same type string
+    __slots__ = ('view', 'type', 'id', 'properties')
+
     def __init__(self, view, json_obj):
         self.view = view
-        self.type = json_obj['@type']
+        self.type = sys.intern(json_obj['@type'])
         self.id = json_obj['properties']['id']
         self.properties = json_obj['properties']
 
@@ -95,6 +163,65 @@ class Annotation(object):
         return self.properties.get(prop)
 
 
+def collect_entities(view, annotations):
+    """Group the named entities in annotations on category and text. The view is
+    used to find the document when an entity does not name it."""
+    entities = {}
+    for anno in annotations:
+        entity = anno.get_property('text')
+        cat = anno.get_property('category')
+        doc = view.get_document(anno)
+        p1 = anno.get_property('start')
+        p2 = anno.get_property('end')
+        entities.setdefault(cat, {})
+        entities[cat].setdefault(entity, []).append((entity, doc, p1, p2, anno, anno))
+    return entities
+
+
+def collect_persons(annotations):
+    persons = []
+    for anno in annotations:
+        if anno.get_property('category') == ENTITY_CATEGORY:
+            persons.append(anno)
+    return persons
+
+
+def collect_contributors(annotations):
+    contributors = {}
+    for anno in annotations:
+        tagname = anno.get_property('tagName')
+        if tagname in CONTRIBUTOR_TYPES:
+            contributors.setdefault(tagname, set()).add(anno.get_property('text'))
+    return contributors
+
+
+def iter_views(fname, view_ids=None, attypes=None):
+    """Read a MMIF file incrementally and yield pairs of a View and an iterator
+    over the Annotations of that view, optionally restricted to some views and
+    annotation types. The View has no annotations of its own and the iterator
+    has to be used before moving on to the next view. Since only one annotation
+    is in memory at a time this works on files of any size:
+
+        for view, annotations in iter_views(fname, attypes={ENTITY_TYPE}):
+            entities = collect_entities(view, annotations)
+
+    """
+    with open(fname) as fh:
+        events = mmifstream.iter_events(fh, view_ids, attypes)
+        for event in events:
+            if event[0] == 'view':
+                view = View(None, dict(event[1], annotations=[]))
+                yield view, _view_annotations(view, events)
+
+
+def _view_annotations(view, events):
+    # shares the event stream with iter_views(), which skips whatever is left
+    for event in events:
+        if event[0] == 'end_view':
+            return
+        yield Annotation(view, event[2])
+
+
 def print_entities(entities):
     for cat in entities:
         for entity in entities[cat]:
@@ -0,0 +1,250 @@
+"""pbcore_export.py
+
+Export PBCore description documents for many MMIF files, using the mappings in
+../pbcore.md:
+
+    TimeFrame with frameType or label bars-and-tones or slate  → pbcoreDescription
+    SemanticTag Date                                           → pbcoreAssetDate
+    SemanticTag Title                                          → pbcoreTitle
+    SemanticTag Host or Producer                               → pbcoreContributor
+    NamedEntity Person, Location or Organization               → pbcoreSubject
+
+Views are picked by the types in their metadata, and optionally by app, rather
+than by their identifiers, and each of them is read in one pass that handles
+all annotation types at once. Subjects are anchored to media time through the
+alignment graph, which is only built if there are entities. PBCore wants the
+elements in a fixed order, so views with only entities are read last and their
+subjects are written to the output as they are found, after the dates and
+titles; subjects from views that also have other types, and the few
+descriptions and contributors, are kept until they can be written.
+
+Files and directories can be given, directories are searched for .json and
+.mmif files, and files are exported in parallel with --jobs:
+
+    $ python pbcore_export.py -j 4 -o pbcore/ /data/mmif/
+
+"""
+
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape, quoteattr
+
+import pbcore
+from utils import type_name
+
+
+PBCORE_NAMESPACE = 'http://www.pbcore.org/PBCore/PBCoreNamespace.html'
+
+DESCRIPTION_TYPES = ('bars-and-tones', 'slate')
+SUBJECT_CATEGORIES = ('Person', 'Location', 'Organization')
+PRIMARY_DOCUMENT_TYPES = ('VideoDocument', 'AudioDocument', 'ImageDocument')
+
+EXPORTED_TYPES = {'TimeFrame', pbcore.TAG_TYPE, pbcore.ENTITY_TYPE}
+
+MMIF_EXTENSIONS = ('.json', '.mmif')
+
+# factors to turn time offsets into milliseconds, other units are not exported
+MILLISECONDS = {'milliseconds': 1, 'seconds': 1000}
+
+
+def select_views(mmif, apps=None):
+    """Return pairs of a view and the names of the types in it, for the views
+    that have types that are exported, restricted to views from apps whose URI
+    starts with one of the given prefixes. Views with named entities come after
+    the other views, and views with only named entities come last."""
+    selected = []
+    for view in mmif.views:
+        app = view.metadata.get('app', '')
+        if apps and not any(app.startswith(prefix) for prefix in apps):
+            continue
+        names = {type_name(attype) for attype in view.metadata.get('contains', {})}
+        if names & EXPORTED_TYPES:
+            selected.append((view, names))
+    selected.sort(key=lambda pair: (pbcore.ENTITY_TYPE in pair[1], pair[1] & EXPORTED_TYPES == {pbcore.ENTITY_TYPE}))
+    return selected
+
+
+def time_unit(view, anno):
+    contains = view.metadata.get('contains', {}).get(anno.type, {})
+    return anno.get_property('timeUnit') or contains.get('timeUnit') or 'milliseconds'
+
+
+def time_attributes(start, end, unit):
+    factor = MILLISECONDS.get(unit)
+    if factor is None or start is None or end is None:
+        return []
+    return [('startTime', round(start * factor)), ('endTime', round(end * factor))]
+
+
+class PBCoreWriter(object):
+
+    """Writes the elements of a pbcoreDescriptionDocument to a file as they are
+    given, the caller takes care of the order of the elements."""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.fh.write('<pbcoreDescriptionDocument xmlns=%s>\n' % quoteattr(PBCORE_NAMESPACE))
+
+    def element(self, name, text=None, attributes=(), children=()):
+        attrs = ''.join(' %s=%s' % (attr, quoteattr(str(value))) for attr, value in attributes)
+        if children:
+            content = ''.join('\n    <%s>%s</%s>' % (child, escape(str(value)), child)
+                              for child, value in children)
+            self.fh.write('\n  <%s%s>%s\n  </%s>\n' % (name, attrs, content, name))
+        elif text is None:
+            self.fh.write('\n  <%s%s />\n' % (name, attrs))
+        else:
+            self.fh.write('\n  <%s%s>%s</%s>\n' % (name, attrs, escape(str(text)), name))
+
+    def close(self):
+        self.fh.write('\n</pbcoreDescriptionDocument>\n')
+
+
+def export_mmif(mmif, fh, apps=None):
+    """Write the PBCore for a pbcore.MMIF to an open file."""
+    writer = PBCoreWriter(fh)
+    # dates, titles and contributors are on the slate of every frame, so they
+    # are kept as dictionary keys to drop repetitions and keep the order
+    dates = {}
+    titles = {}
+    descriptions = []
+    contributors = {}
+    graph = None
+    header_written = False
+    # subjects found before the header can be written, in views that also have
+    # dates or titles
+    pending = []
+
+    def write_header():
+        for date in dates:
+            writer.element('pbcoreAssetDate', date, [('dateType', 'broadcast')])
+        for doc in mmif.documents:
+            location = doc['properties'].get('location')
+            if location and type_name(doc['@type']) in PRIMARY_DOCUMENT_TYPES:
+                writer.element('pbcoreIdentifier', location, [('source', 'location')])
+        for title in titles:
+            writer.element('pbcoreTitle', title)
+
+    for view, names in select_views(mmif, apps):
+        if pbcore.ENTITY_TYPE in names:
+            if names & EXPORTED_TYPES == {pbcore.ENTITY_TYPE} and not header_written:
+                # all dates and titles have been seen, since these views come last
+                write_header()
+                header_written = True
+                for text, attributes in pending:
+                    writer.element('pbcoreSubject', text, attributes)
+                pending = []
+            if graph is None:
+                graph = mmif.get_alignment_graph()
+        # one pass over the view for all exported types, with the name of each
+        # type looked up only once
+        type_names = {}
+        for anno in view.annotations:
+            name = type_names.get(anno.type)
+            if name is None:
+                name = type_names[anno.type] = type_name(anno.type)
+            if name not in EXPORTED_TYPES:
+                continue
+            props = anno.properties
+            if name == pbcore.ENTITY_TYPE:
+                category = props.get('category')
+                if category in SUBJECT_CATEGORIES:
+                    anchor = graph.anchor(anno)
+                    times = [] if anchor is None else time_attributes(anchor.start, anchor.end, anchor.unit)
+                    attributes = [('subjectType', category)] + times
+                    if header_written:
+                        writer.element('pbcoreSubject', props.get('text'), attributes)
+                    else:
+                        pending.append((props.get('text'), attributes))
+            elif name == pbcore.TAG_TYPE:
+                tagname = props.get('tagName')
+                if tagname == pbcore.DATE_TYPE:
+                    dates.setdefault(props.get('text'))
+                elif tagname == pbcore.TITLE_TYPE:
+                    titles.setdefault(props.get('text'))
+                elif tagname in pbcore.CONTRIBUTOR_TYPES:
+                    contributors.setdefault((props.get('text'), tagname))
+            else:
+                frame_type = props.get('frameType') or props.get('label')
+                if frame_type in DESCRIPTION_TYPES:
+                    times = time_attributes(props.get('start'), props.get('end'), time_unit(view, anno))
+                    descriptions.append([('descriptionType', frame_type)] + times)
+    if not header_written:
+        write_header()
+        for text, attributes in pending:
+            writer.element('pbcoreSubject', text, attributes)
+    for attributes in descriptions:
+        writer.element('pbcoreDescription', attributes=attributes)
+    for contributor, role in contributors:
+        writer.element('pbcoreContributor', children=[('contributor', contributor), ('contributorRole', role)])
+    writer.close()
+
+
+def export_file(infile, outfile, apps=None):
+    """Export one MMIF file, returning an error message or None."""
+    try:
+        mmif = pbcore.MMIF(infile)
+        os.makedirs(os.path.dirname(os.path.abspath(outfile)), exist_ok=True)
+        with open(outfile, 'w', encoding='utf8') as fh:
+            export_mmif(mmif, fh, apps)
+    except Exception as e:
+        return '%s: %s' % (type(e).__name__, e)
+    return None
+
+
+def find_mmif_files(paths):
+    """Return pairs of a MMIF file and the path relative to the directory given
+    for it, for files and for the MMIF files in directories."""
+    found = []
+    for path in paths:
+        if not os.path.isdir(path):
+            found.append((path, os.path.basename(path)))
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for fname in sorted(files):
+                if fname.endswith(MMIF_EXTENSIONS):
+                    full_path = os.path.join(root, fname)
+                    found.append((full_path, os.path.relpath(full_path, path)))
+    return found
+
+
+def output_file(infile, relpath, outdir=None):
+    if outdir is None:
+        return os.path.splitext(infile)[0] + '.pbcore.xml'
+    return os.path.join(outdir, os.path.splitext(relpath)[0] + '.xml')
+
+
+def _export(job):
+    return export_file(*job)
+
+
+def export_files(paths, outdir=None, apps=None, jobs=1):
+    """Export MMIF files and directories with MMIF files, in parallel if jobs is
+    more than one, and return a list of (input file, output file, error) with
+    None for the error if the export worked."""
+    jobs_list = [(infile, output_file(infile, relpath, outdir), apps)
+                 for infile, relpath in find_mmif_files(paths)]
+    if jobs > 1 and len(jobs_list) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            errors = list(executor.map(_export, jobs_list, chunksize=max(1, len(jobs_list) // (jobs * 4))))
+    else:
+        errors = [_export(job) for job in jobs_list]
+    return [(infile, outfile, error) for (infile, outfile, _), error in zip(jobs_list, errors)]
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Export PBCore from MMIF files.')
+    parser.add_argument('paths', nargs='+', help='MMIF files or directories with MMIF files')
+    parser.add_argument('-o', '--outdir', help='directory for the PBCore files (default: next to the MMIF files)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of files to export in parallel')
+    parser.add_argument('--app', action='append', dest='apps',
+                        help='only use views from apps with this URI prefix, can be repeated')
+    args = parser.parse_args()
+    results = export_files(args.paths, args.outdir, args.apps, args.jobs)
+    for infile, outfile, error in results:
+        print('%s -> %s' % (infile, outfile if error is None else 'FAILED, %s' % error))
+    sys.exit(1 if any(error is not None for _, _, error in results) else 0)
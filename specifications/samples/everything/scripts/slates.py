@@ -5,7 +5,7 @@ example.
 
 """
 
-from utils import print_annotation
+from utils import AnnotationWriter
 
 
 # Tags from the text documents for the slates, again some repetition. Very
@@ -28,18 +28,19 @@ tags = [
 
 if __name__ == '__main__':
 
-    count = 0
-    for tag in tags:
-        count += 1
-        tag_id = 'st%s' % count
-        text, cat, document = tag
-        start = 0
-        end = len(text)
-        print_annotation(
-            "http://vocab.lappsgrid.org/SemanticTag",
-            [('id', tag_id),
-             ('document', document),
-             ('start', start),
-             ('end', end),
-             ('tagName', cat),
-             ('text', text)])
+    with AnnotationWriter() as writer:
+        count = 0
+        for tag in tags:
+            count += 1
+            tag_id = 'st%s' % count
+            text, cat, document = tag
+            start = 0
+            end = len(text)
+            writer.write(
+                "http://vocab.lappsgrid.org/SemanticTag",
+                [('id', tag_id),
+                 ('document', document),
+                 ('start', start),
+                 ('end', end),
+                 ('tagName', cat),
+                 ('text', text)])
@@ -5,7 +5,7 @@ the example.
 
 """
 
-from utils import print_annotation
+from utils import AnnotationWriter
 
 
 # These are lined up in order of the bounding boxes from EAST. Notice the
@@ -19,18 +19,19 @@ text_values = [
 
 if __name__ == '__main__':
 
-    count = 0
-    for text in text_values:
-        count += 1
-        box_id = 'v5:bb%s' % count
-        text_id = 'td%s' % count
-        align_id = 'a%s' % count
-        print_annotation(
-            "http://mmif.clams.ai/0.2.0/vocabulary/TextDocument",
-            [('id', text_id),
-             ('text-@value', text)])
-        print_annotation(
-            "http://mmif.clams.ai/0.2.0/vocabulary/Alignment",
-            [('id', align_id),
-             ('source', box_id),
-             ('target', text_id)])
+    with AnnotationWriter() as writer:
+        count = 0
+        for text in text_values:
+            count += 1
+            box_id = 'v5:bb%s' % count
+            text_id = 'td%s' % count
+            align_id = 'a%s' % count
+            writer.write(
+                "http://mmif.clams.ai/0.2.0/vocabulary/TextDocument",
+                [('id', text_id),
+                 ('text', {'@value': text})])
+            writer.write(
+                "http://mmif.clams.ai/0.2.0/vocabulary/Alignment",
+                [('id', align_id),
+                 ('source', box_id),
+                 ('target', text_id)])
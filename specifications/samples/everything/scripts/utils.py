@@ -1,20 +1,117 @@
+import sys
+import json
 
-def print_annotation(attype, properties):
-    print("        {")
-    print('          "@type": "%s",' % attype)
-    print('          "properties": {')
-    for prop, value in properties[:-1]:
-        print_property(prop, value)
-    for prop, value in properties[-1:]:
-        print_property(prop, value, last=True)
-    print("        },")
-
-
-def print_property(prop, value, last=False):
-    eol = ' }' if last else ','
-    if type(value) in (int, list):
-        print('            "%s": %s%s' % (prop, value, eol))
-    elif prop == 'text-@value':
-        print('            "text": { "@value": "%s" }%s' % (value, eol))
-    else:
-        print('            "%s": "%s"%s' % (prop, value, eol))
+
+def type_name(attype):
+    """Return the name of a type from its URI, for example 'TimeFrame' for
+    http://mmif.clams.ai/vocabulary/TimeFrame/v5."""
+    parts = attype.rstrip('/').split('/')
+    if len(parts) > 1 and parts[-1][:1] == 'v' and parts[-1][1:].isdigit():
+        return parts[-2]
+    return parts[-1]
+
+
+encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+class AnnotationWriter(object):
+
+    """Writes a JSON list of annotations while they are generated, formatted like
+    the annotations in raw.json so the output can be pasted into a view. Output
+    goes through a buffer that is written out when it is full and nothing else
+    is kept, so there is no limit on the number of annotations. Use it as a
+    context manager, so that the list is opened and closed:
+
+        with AnnotationWriter() as writer:
+            writer.write(attype, [('id', 't1'), ('start', 0), ('end', 5)])
+
+    """
+
+    def __init__(self, fh=None, indent=8, buffer_size=1 << 16):
+        self.fh = sys.stdout if fh is None else fh
+        self.indent = ' ' * indent
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.buffered = 0
+        self.count = 0
+        # types and property names repeat, so they are only encoded once
+        self.names = {}
+
+    def __enter__(self):
+        self._write('[')
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write(self, text):
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= self.buffer_size:
+            self.flush()
+
+    def _name(self, name):
+        self.names[name] = encode(name)
+        return self.names[name]
+
+    def flush(self):
+        self.fh.write(''.join(self.buffer))
+        self.buffer = []
+        self.buffered = 0
+
+    def write(self, attype, properties):
+        """Write an annotation, with the properties given as a dictionary or as
+        a list of pairs of property name and value."""
+        if isinstance(properties, dict):
+            properties = properties.items()
+        indent = self.indent
+        names = self.names
+        lines = [',\n' if self.count else '\n', indent, '{\n',
+                 indent, '  "@type": ', names.get(attype) or self._name(attype), ',\n',
+                 indent, '  "properties": {']
+        separator = '\n'
+        for prop, value in properties:
+            lines.extend((separator, indent, '    ', names.get(prop) or self._name(prop), ': ',
+                          format_value(value, indent + '    ')))
+            separator = ',\n'
+        lines.extend(('\n', indent, '  }\n', indent, '}'))
+        self._write(''.join(lines))
+        self.count += 1
+
+    def write_all(self, annotations):
+        """Write annotations given as pairs of type and properties."""
+        for attype, properties in annotations:
+            self.write(attype, properties)
+
+    def write_columns(self, attype, columns):
+        """Write annotations of one type given as a dictionary from property
+        names to lists of values, one value for each annotation."""
+        names = list(columns)
+        for row in zip(*columns.values()):
+            self.write(attype, zip(names, row))
+
+    def write_interleaved(self, batch):
+        """Write annotations given as a list of (type, columns) pairs with the
+        same number of values in all columns, taking one annotation from each
+        pair in turn."""
+        names = [(attype, list(columns)) for attype, columns in batch]
+        for rows in zip(*(zip(*columns.values()) for _, columns in batch)):
+            for (attype, keys), row in zip(names, rows):
+                self.write(attype, zip(keys, row))
+
+    def close(self):
+        self._write('\n%s]\n' % self.indent[:-2])
+        self.flush()
+        self.fh.flush()
+
+
+def format_value(value, indent):
+    """Format a property value, with objects spread over several lines like
+    text values in raw.json, and everything else on one line."""
+    if type(value) is int:
+        return str(value)
+    if isinstance(value, dict) and value:
+        items = ['%s  %s: %s' % (indent, encode(key), format_value(item, indent + '  '))
+                 for key, item in value.items()]
+        return '{\n%s\n%s}' % (',\n'.join(items), indent)
+    return encode(value)
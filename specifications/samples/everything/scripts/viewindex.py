@@ -0,0 +1,158 @@
+"""viewindex.py
+
+Random access to the views of large MMIF files.
+
+An index with the byte range of each view in a MMIF file, and of chunks of the
+annotations in each view, is created once and saved next to the file. After
+that a view can be read by mapping the file into memory and decoding only the
+bytes of that view, so reading a view does not depend on the size of the file:
+
+    $ python viewindex.py ../raw.json            # creates ../raw.json.idx
+    $ python viewindex.py ../raw.json v8         # prints the annotations of v8
+
+The index is created with the streaming parser from mmifstream.py. The file is
+read as Latin-1 so that character offsets are byte offsets, which works because
+all the JSON syntax is ASCII; only the view identifiers are decoded as UTF-8.
+
+"""
+
+import os
+import sys
+import json
+import mmap
+
+import mmifstream
+import pbcore
+
+
+INDEX_SUFFIX = '.idx'
+
+# number of annotations in each indexed chunk
+CHUNK_SIZE = 1000
+
+
+def index_file(fname):
+    return fname + INDEX_SUFFIX
+
+
+def build_index(fname, chunk_size=CHUNK_SIZE):
+    """Return the index of a MMIF file as a dictionary, with the size and the
+    modification time of the file and for each view identifier the byte range
+    of the view and the byte ranges and sizes of its chunks of annotations."""
+    views = {}
+    stat = os.stat(fname)
+    with open(fname, encoding='latin-1', newline='') as fh:
+        scanner = mmifstream.JSONScanner(fh)
+        for key in scanner.members():
+            if key != 'views':
+                scanner.value()
+                continue
+            for _ in scanner.elements():
+                start = position(scanner)
+                view_id, chunks = _index_view(scanner, chunk_size)
+                views[view_id] = {'start': start, 'end': position(scanner), 'chunks': chunks}
+    return {'size': stat.st_size, 'mtime': stat.st_mtime, 'chunk_size': chunk_size, 'views': views}
+
+
+def position(scanner):
+    """Return the byte offset of the next value."""
+    scanner.peek()
+    return scanner.offset + scanner.pos
+
+
+def _index_view(scanner, chunk_size):
+    view_id = None
+    chunks = []
+    for key in scanner.members():
+        if key == 'id':
+            # decode the identifier again from its bytes, which are UTF-8
+            start = position(scanner)
+            scanner.value()
+            raw = scanner.buffer[start - scanner.offset:scanner.pos]
+            view_id = json.loads(raw.encode('latin-1'))
+        elif key == 'annotations':
+            chunk = None
+            for i in scanner.elements():
+                start = position(scanner)
+                scanner.value()
+                if i % chunk_size == 0:
+                    chunk = [start, None, 0]
+                    chunks.append(chunk)
+                chunk[1] = scanner.offset + scanner.pos
+                chunk[2] += 1
+        else:
+            scanner.value()
+    return view_id, chunks
+
+
+def load_index(fname, chunk_size=CHUNK_SIZE):
+    """Return the index of a MMIF file, creating or recreating it if it is
+    missing or older than the file."""
+    stat = os.stat(fname)
+    try:
+        with open(index_file(fname)) as fh:
+            index = json.load(fh)
+        if index['size'] == stat.st_size and index['mtime'] == stat.st_mtime:
+            return index
+    except (OSError, ValueError, KeyError):
+        pass
+    index = build_index(fname, chunk_size)
+    with open(index_file(fname), 'w') as fh:
+        json.dump(index, fh)
+    return index
+
+
+class ViewReader(object):
+
+    """Reads single views from a memory-mapped MMIF file using its index."""
+
+    def __init__(self, fname):
+        self.index = load_index(fname)
+        self._fh = open(fname, 'rb')
+        self.mmap = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.mmap.close()
+        self._fh.close()
+
+    def view_ids(self):
+        return list(self.index['views'])
+
+    def get_view_json(self, view_id):
+        """Return the JSON object of a view, or None if there is no such view."""
+        entry = self.index['views'].get(view_id)
+        if entry is None:
+            return None
+        return json.loads(self.mmap[entry['start']:entry['end']])
+
+    def get_view(self, view_id):
+        """Return a view as a pbcore.View, or None if there is no such view."""
+        view_json = self.get_view_json(view_id)
+        return None if view_json is None else pbcore.View(None, view_json)
+
+    def iter_annotations(self, view_id):
+        """Generate the JSON objects of the annotations of a view, decoding one
+        chunk of annotations at a time."""
+        for start, end, _ in self.index['views'][view_id]['chunks']:
+            yield from json.loads(b'[' + self.mmap[start:end] + b']')
+
+
+if __name__ == '__main__':
+
+    infile = sys.argv[1]
+    with ViewReader(infile) as reader:
+        if len(sys.argv) < 3:
+            for view_id, entry in reader.index['views'].items():
+                annotations = sum(chunk[2] for chunk in entry['chunks'])
+                print('%-8s bytes %d-%d, %d annotations' % (view_id, entry['start'], entry['end'], annotations))
+        else:
+            view = reader.get_view(sys.argv[2])
+            print(view)
+            for anno in view.annotations:
+                print(anno.id, anno.type)
@@ -0,0 +1,182 @@
+"""
+
+Check MMIF files against the CLAMS vocabulary.
+
+The JSON schema only checks the overall structure of a MMIF file. This script
+checks annotations and documents against the definitions of their types in the
+vocabulary:
+
+- all properties that are marked as required for the type or any of its
+  ancestors must be present
+- annotations must have a `document` property unless the view metadata gives
+  the document for all annotations of the type
+- if the view metadata has a `labelset` for the type, the `label` property of
+  each annotation must be in it
+
+The vocabulary is turned into a `Tree` once and for each type URI (name plus
+version) the effective required properties are compiled into a rule, so that
+checking an annotation is a dictionary lookup on its `@type` and a few
+membership tests. Types from other vocabularies, like the LAPPS vocabulary,
+are not checked.
+
+By default the vocabulary in the working tree is used, with the type versions
+of the current release. With `--all-releases` the vocabularies of all earlier
+releases that are available as git tags are added, so that files with older
+type versions can be checked too:
+
+```bash
+$ python vocabcheck.py docs/1.1.0/samples/*/raw.json
+```
+
+"""
+import argparse
+import json
+import os
+import sys
+from os.path import join as pjoin
+from typing import Dict, List, Optional, Tuple
+
+import build
+
+VOCABULARY_URL = f'{build.BASEURL}/vocabulary'
+VOCABULARY_YAML = pjoin('vocabulary', 'clams.vocabulary.yaml')
+
+
+def attype_uri(name: str, version: str) -> str:
+    return f'{VOCABULARY_URL}/{name}/{version}'
+
+
+class TypeRule(object):
+    """The checks that apply to annotations of one version of a type."""
+
+    __slots__ = ('name', 'required', 'needs_document', 'has_label')
+
+    def __init__(self, tree: build.Tree, name: str) -> None:
+        effective = tree.effective_schema(name)
+        self.name = name
+        self.required = tuple(prop for prop, info in effective['properties'].items()
+                              if info['definition'].get('required'))
+        # document is metadata of Annotation, so all annotations over a document need one
+        self.needs_document = 'document' in effective['metadata']
+        self.has_label = 'label' in effective['properties']
+
+
+class VocabularyChecker(object):
+    """Dispatch table from type URIs to compiled rules, for one or more releases
+    of the vocabulary."""
+
+    def __init__(self) -> None:
+        self.rules: Dict[str, TypeRule] = {}
+        self.releases: List[str] = []
+
+    def add_release(self, release: str, clams_types: List[Dict], versions: Dict[str, str]) -> None:
+        """Add the rules for the types of a release. Rules for type URIs that
+        are already known are kept, so releases should be added newest first."""
+        tree = build.Tree(clams_types)
+        for clams_type in tree.types:
+            version = versions.get(clams_type['name'])
+            if version is not None:
+                self.rules.setdefault(attype_uri(clams_type['name'], version), TypeRule(tree, clams_type['name']))
+        self.releases.append(release)
+
+    @classmethod
+    def from_repository(cls, dirname: str, all_releases: bool = False) -> 'VocabularyChecker':
+        """Create a checker from the vocabulary in the working tree, using the
+        type versions from the docs of the current release, and optionally from
+        the vocabularies of the earlier releases in the attype versions index."""
+        checker = cls()
+        version = open(pjoin(dirname, 'VERSION')).read().strip()
+        index = build.AttypeVersionsIndex(
+            pjoin(dirname, 'docs', 'vocabulary', build.ATTYPE_VERSIONS_INDEX_JSONFILENAME))
+        versions_fname = pjoin(dirname, 'docs', version, 'vocabulary', build.ATTYPE_VERSIONS_JSONFILENAME)
+        if os.path.exists(versions_fname):
+            versions = json.load(open(versions_fname))
+        else:
+            versions = index.release_versions(version)
+        checker.add_release(version, build.read_yaml(pjoin(dirname, VOCABULARY_YAML)), versions)
+        if all_releases:
+            older = sorted((r for r in index.releases if r != version), key=build.ver_parse, reverse=True)
+            with build.GitObjects(dirname) as git:
+                for release in older:
+                    clams_types = git.read_yaml(release, VOCABULARY_YAML)
+                    if clams_types is None:
+                        print(f'skipping release {release}, its vocabulary is not in the repository', file=sys.stderr)
+                        continue
+                    checker.add_release(release, clams_types, index.release_versions(release))
+        return checker
+
+    def compile_check(self, attype: str, type_metadata: Optional[Dict]):
+        """Return a function that checks the properties of an annotation of a
+        type in a view whose metadata for that type is given. The function
+        returns a list of error messages. Returns None if there is nothing to
+        check, which includes all types that are not from the CLAMS vocabulary."""
+        rule = self.rules.get(attype)
+        if rule is None:
+            if not attype.startswith(VOCABULARY_URL + '/'):
+                return None
+            message = f'unknown type {attype}'
+            return lambda props: [message]
+        type_metadata = type_metadata or {}
+        required = rule.required
+        if rule.needs_document and 'document' not in type_metadata:
+            required += ('document',)
+        labelset = None
+        if rule.has_label and 'labelset' in type_metadata:
+            labelset = frozenset(type_metadata['labelset'])
+        if not required and labelset is None:
+            return None
+
+        def check(props: Dict) -> List[str]:
+            errors = [f'missing required property {prop}' for prop in required if prop not in props]
+            if labelset is not None and 'label' in props and props['label'] not in labelset:
+                errors.append(f'label {props["label"]} is not in the labelset')
+            return errors
+        return check
+
+    def check_mmif(self, mmif: Dict, max_errors: int = 100) -> List[Tuple[str, str]]:
+        """Return a list of (JSON path, error message) pairs for the documents and
+        annotations in a MMIF object, stopping after max_errors errors."""
+        errors = []
+        checks = {}
+        for i, document in enumerate(mmif.get('documents', [])):
+            attype = document['@type']
+            if attype not in checks:
+                checks[attype] = self.compile_check(attype, None)
+            if checks[attype] is not None:
+                for message in checks[attype](document['properties']):
+                    errors.append((f'$.documents[{i}].properties', message))
+        for i, view in enumerate(mmif.get('views', [])):
+            contains = view.get('metadata', {}).get('contains', {})
+            # checks depend on the view metadata, so each view has its own dispatch table
+            checks = {}
+            for j, annotation in enumerate(view.get('annotations', [])):
+                attype = annotation['@type']
+                check = checks.get(attype, False)
+                if check is False:
+                    check = checks[attype] = self.compile_check(attype, contains.get(attype))
+                if check is None:
+                    continue
+                for message in check(annotation['properties']):
+                    errors.append((f'$.views[{i}].annotations[{j}].properties', message))
+                if len(errors) >= max_errors:
+                    return errors[:max_errors]
+        return errors[:max_errors]
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('files', nargs='+', help='MMIF files to check')
+    parser.add_argument('--all-releases', action='store_true',
+                        help='also accept type versions from earlier releases')
+    parser.add_argument('--max-errors', type=int, default=100, help='maximum number of errors reported per file')
+    args = parser.parse_args()
+    checker = VocabularyChecker.from_repository(os.path.dirname(os.path.abspath(__file__)), args.all_releases)
+    failed = False
+    for fname in args.files:
+        errors = checker.check_mmif(json.load(open(fname)), args.max_errors)
+        print(f'{fname}: {"valid" if not errors else f"{len(errors)} error(s)"}')
+        for path, message in errors:
+            print(f'    {path}: {message}')
+        failed = failed or bool(errors)
+    sys.exit(1 if failed else 0)